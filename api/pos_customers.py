@@ -1,89 +1,85 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlmodel import Session, select
+from sqlalchemy.orm import defer
 from database import get_session
 from models.auth import Token
 from models.pos_models import Customer, Sale
 from .schemas.pos_schemas import (
-    CustomerRequest, CustomerResponse, CustomerWalletRequest,
-    CustomerSearchResponse, SaleResponse, MessageResponse
+    CustomerRequest, CustomerBulkRequest, CustomerResponse, CustomerWalletRequest,
+    CustomerSearchResponse, SaleResponse, MessageResponse,
+    sale_items_adapter, payment_methods_adapter
 )
-from helpers.auth import get_auth_token, require_admin_or_agent
-from datetime import datetime, timezone
+from helpers.auth import get_admin_or_agent_token
+from helpers.search import escape_like, LIKE_ESCAPE
+from helpers.db import dialect_insert
+from helpers.cache import customer_search_cache
 from decimal import Decimal
 
 router = APIRouter(prefix="/customers", tags=["pos_customers"])
 
+# Columns backing CustomerResponse; search projects these instead of hydrating Customer entities
+CUSTOMER_RESPONSE_COLUMNS = (
+    Customer.id, Customer.phone, Customer.name, Customer.loyalty_points,
+    Customer.is_active, Customer.created_at, Customer.updated_at
+)
+
 
 @router.get("/search", response_model=CustomerSearchResponse)
-async def search_customers(
-    phone: str = Query(..., description="Phone number to search (partial match)"),
-    token: Token = Depends(get_auth_token),
+def search_customers(
+    phone: str = Query(..., min_length=2, description="Phone number to search (partial match, 2+ characters)"),
+    mode: str = Query("contains", pattern="^(contains|prefix)$", description="Match anywhere (contains) or from the start (prefix)"),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Search customers by phone number using LIKE pattern."""
-    await require_admin_or_agent(token, db_session)
-
-    # Search using LIKE pattern
-    statement = select(Customer).where(
-        Customer.phone.like(f'%{phone}%'),
+    # Repeated admin searches are served from the short-lived cache
+    cache_key = (phone, mode)
+    cached = customer_search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Prefix matches use the text_pattern_ops btree, substring matches the trigram index
+    escaped = escape_like(phone)
+    pattern = f'{escaped}%' if mode == "prefix" else f'%{escaped}%'
+    statement = select(*CUSTOMER_RESPONSE_COLUMNS).where(
+        Customer.phone.like(pattern, escape=LIKE_ESCAPE),
         Customer.is_active == True
     )
-    customers = db_session.exec(statement).all()
-
-    customer_responses = [
-        CustomerResponse(
-            id=customer.id,
-            phone=customer.phone,
-            name=customer.name,
-            loyalty_points=customer.loyalty_points,
-            is_active=customer.is_active,
-            created_at=customer.created_at,
-            updated_at=customer.updated_at
-        )
-        for customer in customers
-    ]
+    rows = db_session.exec(statement).all()
 
-    return CustomerSearchResponse(customers=customer_responses)
+    # Values come straight from the database, so skip re-validation
+    customer_responses = [CustomerResponse.model_construct(**row._mapping) for row in rows]
+
+    response = CustomerSearchResponse(customers=customer_responses)
+    customer_search_cache.set(cache_key, response)
+    return response
 
 
 @router.post("/", response_model=CustomerResponse)
-async def create_customer(
+def create_customer(
     customer_data: CustomerRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Create new customer or return existing one if phone already exists."""
-    await require_admin_or_agent(token, db_session)
-
-    # Check if customer already exists
-    existing_customer = db_session.exec(
-        select(Customer).where(Customer.phone == customer_data.phone)
-    ).first()
-
-    if existing_customer:
-        return CustomerResponse(
-            id=existing_customer.id,
-            phone=existing_customer.phone,
-            name=existing_customer.name,
-            loyalty_points=existing_customer.loyalty_points,
-            is_active=existing_customer.is_active,
-            created_at=existing_customer.created_at,
-            updated_at=existing_customer.updated_at
-        )
-
-    # Create new customer
-    new_customer = Customer(
-        phone=customer_data.phone,
-        name=customer_data.name,
-        loyalty_points=Decimal("0.00"),
-        is_active=True,
-        created_at=datetime.now(timezone.utc),
-        updated_at=datetime.now(timezone.utc)
+    # Single race-free round trip: insert, or hand back the existing row for this phone
+    statement = dialect_insert(db_session, Customer).values(
+        Customer(
+            phone=customer_data.phone,
+            name=customer_data.name,
+            loyalty_points=Decimal("0.00"),
+            is_active=True
+        ).model_dump()
     )
+    # No-op update so RETURNING also yields an existing customer unchanged
+    statement = statement.on_conflict_do_update(
+        index_elements=[Customer.phone],
+        set_={"phone": statement.excluded.phone}
+    ).returning(Customer)
 
-    db_session.add(new_customer)
+    new_customer = db_session.exec(statement).scalar_one()
     db_session.commit()
-    db_session.refresh(new_customer)
+    customer_search_cache.invalidate()
 
     return CustomerResponse(
         id=new_customer.id,
@@ -96,16 +92,48 @@ async def create_customer(
     )
 
 
+@router.post("/bulk", response_model=CustomerSearchResponse)
+def bulk_create_customers(
+    bulk_data: CustomerBulkRequest,
+    token: Token = Depends(get_admin_or_agent_token),
+    db_session: Session = Depends(get_session)
+):
+    """Create customers in a single INSERT, returning existing ones unchanged if the phone already exists."""
+    # One row per phone: ON CONFLICT cannot affect the same row twice in one statement
+    rows = {}
+    for customer_data in bulk_data.customers:
+        if customer_data.phone not in rows:
+            rows[customer_data.phone] = Customer(
+                phone=customer_data.phone,
+                name=customer_data.name,
+                loyalty_points=Decimal("0.00"),
+                is_active=True
+            ).model_dump()
+
+    statement = dialect_insert(db_session, Customer).values(list(rows.values()))
+    # No-op update so existing customers come back through RETURNING unchanged
+    statement = statement.on_conflict_do_update(
+        index_elements=[Customer.phone],
+        set_={"phone": statement.excluded.phone}
+    ).returning(Customer)
+
+    customers = db_session.exec(statement).scalars().all()
+    db_session.commit()
+    customer_search_cache.invalidate()
+
+    customer_responses = [CustomerResponse.model_validate(customer) for customer in customers]
+
+    return CustomerSearchResponse(customers=customer_responses)
+
+
 @router.put("/{customer_id}", response_model=CustomerResponse)
-async def update_customer(
+def update_customer(
     customer_id: str,
     customer_data: CustomerRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Update customer information (name only)."""
-    await require_admin_or_agent(token, db_session)
-
     customer = db_session.get(Customer, customer_id)
     if not customer:
         raise HTTPException(
@@ -113,13 +141,12 @@ async def update_customer(
             detail="Customer not found"
         )
 
-    # Update only name, phone cannot be changed
+    # Update only name, phone cannot be changed (updated_at is stamped by the model)
     customer.name = customer_data.name
-    customer.updated_at = datetime.now(timezone.utc)
 
     db_session.add(customer)
     db_session.commit()
-    db_session.refresh(customer)
+    customer_search_cache.invalidate()
 
     return CustomerResponse(
         id=customer.id,
@@ -133,15 +160,13 @@ async def update_customer(
 
 
 @router.put("/{customer_id}/wallet", response_model=CustomerResponse)
-async def update_customer_wallet(
+def update_customer_wallet(
     customer_id: str,
     wallet_data: CustomerWalletRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Update customer loyalty points."""
-    await require_admin_or_agent(token, db_session)
-
     customer = db_session.get(Customer, customer_id)
     if not customer:
         raise HTTPException(
@@ -150,11 +175,10 @@ async def update_customer_wallet(
         )
 
     customer.loyalty_points = wallet_data.loyalty_points
-    customer.updated_at = datetime.now(timezone.utc)
 
     db_session.add(customer)
     db_session.commit()
-    db_session.refresh(customer)
+    customer_search_cache.invalidate()
 
     return CustomerResponse(
         id=customer.id,
@@ -168,14 +192,14 @@ async def update_customer_wallet(
 
 
 @router.get("/{customer_id}/sales", response_model=list[SaleResponse])
-async def get_customer_sales(
+def get_customer_sales(
     customer_id: str,
-    token: Token = Depends(get_auth_token),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(20, ge=1, le=100, description="Page size"),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
-    """Get sales history for a customer."""
-    await require_admin_or_agent(token, db_session)
-
+    """Get paginated sales history for a customer, newest first."""
     customer = db_session.get(Customer, customer_id)
     if not customer:
         raise HTTPException(
@@ -183,29 +207,42 @@ async def get_customer_sales(
             detail="Customer not found"
         )
 
-    statement = select(Sale).where(Sale.customer_id == customer_id).order_by(Sale.created_at.desc())
+    # embedding_vector is never part of the response, don't load it
+    statement = (
+        select(Sale)
+        .options(defer(Sale.embedding_vector))
+        .where(Sale.customer_id == customer_id)
+        .order_by(Sale.created_at.desc())  # Walks ix_sale_customer_created
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
     sales = db_session.exec(statement).all()
 
+    # Same customer for every sale, build its response once. Column values come
+    # straight from the database, so skip re-validation (as in search_customers)
+    customer_response = CustomerResponse.model_construct(
+        id=customer.id,
+        phone=customer.phone,
+        name=customer.name,
+        loyalty_points=customer.loyalty_points,
+        is_active=customer.is_active,
+        created_at=customer.created_at,
+        updated_at=customer.updated_at
+    )
+
     sale_responses = []
     for sale in sales:
-        sale_responses.append(SaleResponse(
+        sale_responses.append(SaleResponse.model_construct(
             id=sale.id,
             customer_id=sale.customer_id,
-            customer=CustomerResponse(
-                id=customer.id,
-                phone=customer.phone,
-                name=customer.name,
-                loyalty_points=customer.loyalty_points,
-                is_active=customer.is_active,
-                created_at=customer.created_at,
-                updated_at=customer.updated_at
-            ),
-            items=sale.get_items(),
+            staff_id=sale.staff_id,
+            customer=customer_response,
+            items=sale_items_adapter.validate_python(sale.items or []),
             subtotal=sale.subtotal,
             discount_amount=sale.discount_amount,
             total_amount=sale.total_amount,
             loyalty_points_generated=sale.loyalty_points_generated,
-            payment_methods=sale.get_payment_methods(),
+            payment_methods=payment_methods_adapter.validate_python(sale.payment_methods or []),
             created_at=sale.created_at,
             updated_at=sale.updated_at
         ))
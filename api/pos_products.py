@@ -1,97 +1,108 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
+from sqlalchemy import func, insert, update
 from database import get_session
 from models.auth import Token
-from models.pos_models import Product
+from models.pos_models import Product, product_search_vector
 from .schemas.pos_schemas import (
-    ProductRequest, ProductResponse, ProductSearchResponse, MessageResponse
+    ProductRequest, ProductBulkRequest, ProductResponse, ProductSearchResponse, MessageResponse
 )
-from helpers.auth import get_auth_token, require_admin_or_agent
-from datetime import datetime, timezone
+from helpers.auth import get_admin_or_agent_token
+from helpers.search import escape_like, LIKE_ESCAPE
+from helpers.cache import product_search_cache
 import json
+
 router = APIRouter(prefix="/products", tags=["pos_products"])
 
+# Columns backing ProductResponse; list endpoints project these instead of
+# hydrating full Product entities (skips embedding_vector and ORM bookkeeping).
+PRODUCT_RESPONSE_COLUMNS = (
+    Product.id, Product.name, Product.description, Product.details, Product.price,
+    Product.variable_price, Product.category, Product.meta_data, Product.is_active,
+    Product.created_at, Product.updated_at
+)
+
+# Rows fetched per round trip when streaming the product list
+LIST_BATCH_SIZE = 1000
+
 
 @router.get("/", response_model=ProductSearchResponse)
-async def list_products(
-    token: Token = Depends(get_auth_token),
+def list_products(
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
-    """List all active products."""
-    await require_admin_or_agent(token, db_session)
-
-    statement = select(Product).where(Product.is_active == True).order_by(Product.name)
-    products = db_session.exec(statement).all()
-
-    product_responses = [
-        ProductResponse(
-            id=product.id,
-            name=product.name,
-            description=product.description,
-            details=product.details,
-            price=product.price,
-            variable_price=product.variable_price,
-            category=product.category,
-            meta_data=product.meta_data,
-            is_active=product.is_active,
-            created_at=product.created_at,
-            updated_at=product.updated_at
-        )
-        for product in products
-    ]
+    """List all active products, streamed as a JSON document in batches."""
+    statement = select(*PRODUCT_RESPONSE_COLUMNS).where(Product.is_active == True).order_by(Product.name)
 
-    return ProductSearchResponse(products=product_responses)
+    bind = db_session.get_bind()
+
+    def generate():
+        # Runs in the threadpool while the response is sent, after the request's
+        # session is torn down, so it reads through its own session on the same
+        # bind; yield_per keeps one batch in memory (server-side cursor on PostgreSQL).
+        with Session(bind) as stream_session:
+            yield b'{"products":['
+            rows = stream_session.exec(statement.execution_options(yield_per=LIST_BATCH_SIZE))
+            for index, row in enumerate(rows):
+                prefix = b"," if index else b""
+                # Same serialization as every other ProductResponse; the columns come
+                # straight from the database, so skip re-validating them
+                yield prefix + ProductResponse.model_construct(**row._mapping).model_dump_json().encode()
+            yield b"]}"
+
+    return StreamingResponse(generate(), media_type="application/json")
 
 
 @router.get("/search", response_model=ProductSearchResponse)
-async def search_products(
-    q: str = Query(..., description="Search query for product name and description"),
-    token: Token = Depends(get_auth_token),
+def search_products(
+    q: str = Query(..., min_length=3, description="Search query for product name and description (3+ characters)"),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Search products using full-text search on name and description."""
-    await require_admin_or_agent(token, db_session)
+    # Repeated admin searches are served from the short-lived cache
+    cached = product_search_cache.get(q)
+    if cached is not None:
+        return cached
+
+    pattern = f'%{escape_like(q)}%'
+    substring_match = (
+        Product.name.ilike(pattern, escape=LIKE_ESCAPE) |
+        Product.description.ilike(pattern, escape=LIKE_ESCAPE)
+    )
+
+    if db_session.get_bind().dialect.name == "postgresql":
+        # Full-text search backed by the ix_product_search_tsv GIN index, plus
+        # substring matches served by the trigram indexes (q has 3+ characters)
+        match = product_search_vector.op('@@')(func.plainto_tsquery('simple', q)) | substring_match
+    else:
+        # Fallback for SQLite: substring match on name and description
+        match = substring_match
 
-    # Full-text search using LIKE on name and description
-    statement = select(Product).where(
-        (Product.name.like(f'%{q}%') | Product.description.like(f'%{q}%')) &
-        (Product.is_active == True)
+    statement = select(*PRODUCT_RESPONSE_COLUMNS).where(
+        match & (Product.is_active == True)
     ).order_by(Product.name)
 
-    products = db_session.exec(statement).all()
+    rows = db_session.exec(statement).all()
 
     # TODO: Implement vector similarity search when embedding_vector is available
     # For now, return full-text search results
 
-    product_responses = [
-        ProductResponse(
-            id=product.id,
-            name=product.name,
-            description=product.description,
-            details=product.details,
-            price=product.price,
-            variable_price=product.variable_price,
-            category=product.category,
-            meta_data=product.meta_data,
-            is_active=product.is_active,
-            created_at=product.created_at,
-            updated_at=product.updated_at
-        )
-        for product in products
-    ]
+    product_responses = [ProductResponse.model_construct(**row._mapping) for row in rows]
 
-    return ProductSearchResponse(products=product_responses)
+    response = ProductSearchResponse(products=product_responses)
+    product_search_cache.set(q, response)
+    return response
 
 
 @router.post("/", response_model=ProductResponse)
-async def create_product(
+def create_product(
     product_data: ProductRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Create new product with automatic embedding generation."""
-    await require_admin_or_agent(token, db_session)
-
     # TODO: Generate embedding for search when vector search is implemented
     # embedding_text = f"{product_data.name} {product_data.description or ''}"
     # embedding_vector = await generate_embedding(embedding_text)
@@ -105,14 +116,12 @@ async def create_product(
         category=product_data.category,
         meta_data=product_data.meta_data or "{}",
         is_active=True,
-        embedding_vector=None,  # Vector search disabled for now
-        created_at=datetime.now(timezone.utc),
-        updated_at=datetime.now(timezone.utc)
+        embedding_vector=None  # Vector search disabled for now
     )
 
     db_session.add(new_product)
     db_session.commit()
-    db_session.refresh(new_product)
+    product_search_cache.invalidate()
 
     return ProductResponse(
         id=new_product.id,
@@ -129,74 +138,81 @@ async def create_product(
     )
 
 
+@router.post("/bulk", response_model=ProductSearchResponse)
+def bulk_create_products(
+    bulk_data: ProductBulkRequest,
+    token: Token = Depends(get_admin_or_agent_token),
+    db_session: Session = Depends(get_session)
+):
+    """Create products in a single INSERT ... RETURNING."""
+    rows = [
+        Product(
+            name=product_data.name,
+            description=product_data.description,
+            details=product_data.details,
+            price=product_data.price,
+            variable_price=product_data.variable_price or False,
+            category=product_data.category,
+            meta_data=product_data.meta_data or "{}",
+            is_active=True,
+            embedding_vector=None  # Vector search disabled for now
+        ).model_dump()
+        for product_data in bulk_data.products
+    ]
+
+    statement = insert(Product).values(rows).returning(*PRODUCT_RESPONSE_COLUMNS)
+    result_rows = db_session.exec(statement).all()
+    db_session.commit()
+    product_search_cache.invalidate()
+
+    product_responses = [ProductResponse.model_construct(**row._mapping) for row in result_rows]
+
+    return ProductSearchResponse(products=product_responses)
+
+
 @router.put("/{product_id}", response_model=ProductResponse)
-async def update_product(
+def update_product(
     product_id: str,
     product_data: ProductRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Update product and regenerate embedding vector."""
-    await require_admin_or_agent(token, db_session)
+    # Apply the provided fields in a single UPDATE ... RETURNING instead of
+    # loading the entity first; None values keep the stored data.
+    changes = product_data.model_dump(exclude_none=True)
 
-    product = db_session.get(Product, product_id)
-    if not product:
+    # TODO: Regenerate embedding when vector search is implemented
+    # embedding_text = f"{product_data.name} {product_data.description or ''}"
+    # embedding_vector = await generate_embedding(embedding_text)
+    changes["embedding_vector"] = None  # Vector search disabled for now
+
+    statement = (
+        update(Product)
+        .where(Product.id == product_id)
+        .values(**changes)
+        .returning(*PRODUCT_RESPONSE_COLUMNS)
+    )
+    row = db_session.exec(statement).one_or_none()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
 
-    # Update product data
-    if product_data.name is not None:
-        product.name = product_data.name
-    if product_data.description is not None:
-        product.description = product_data.description
-    if product_data.details is not None:
-        product.details = product_data.details
-    if product_data.price is not None:
-        product.price = product_data.price
-    if product_data.variable_price is not None:
-        product.variable_price = product_data.variable_price
-    if product_data.category is not None:
-        product.category = product_data.category
-    if product_data.meta_data is not None:
-        product.meta_data = product_data.meta_data
-
-    product.updated_at = datetime.now(timezone.utc)
-
-    # TODO: Regenerate embedding when vector search is implemented
-    # embedding_text = f"{product_data.name} {product_data.description or ''}"
-    # embedding_vector = await generate_embedding(embedding_text)
-    product.embedding_vector = None  # Vector search disabled for now
-
-    db_session.add(product)
     db_session.commit()
-    db_session.refresh(product)
+    product_search_cache.invalidate()
 
-    return ProductResponse(
-        id=product.id,
-        name=product.name,
-        description=product.description,
-        details=product.details,
-        price=product.price,
-        variable_price=product.variable_price,
-        category=product.category,
-        meta_data=product.meta_data,
-        is_active=product.is_active,
-        created_at=product.created_at,
-        updated_at=product.updated_at
-    )
+    return ProductResponse.model_construct(**row._mapping)
 
 
 @router.delete("/{product_id}", response_model=MessageResponse)
-async def delete_product(
+def delete_product(
     product_id: str,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Soft delete product by setting is_active=False."""
-    await require_admin_or_agent(token, db_session)
-
     product = db_session.get(Product, product_id)
     if not product:
         raise HTTPException(
@@ -205,9 +221,9 @@ async def delete_product(
         )
 
     product.is_active = False
-    product.updated_at = datetime.now(timezone.utc)
 
     db_session.add(product)
     db_session.commit()
+    product_search_cache.invalidate()
 
     return MessageResponse(message=f"Product {product.name} deactivated successfully")
\ No newline at end of file
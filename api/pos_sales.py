@@ -1,60 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func, text, tuple_, update
+from sqlalchemy.orm import joinedload, selectinload, raiseload, defer
 from database import get_session
 from models.auth import Token
 from models.pos_models import Sale, Customer, Staff
 from .schemas.pos_schemas import (
-    SaleRequest, SaleResponse, SaleListResponse, CustomerResponse, StaffResponse
+    SaleRequest, SaleResponse, SaleListResponse, CustomerResponse, StaffResponse,
+    sale_items_adapter, payment_methods_adapter
 )
-from helpers.auth import get_auth_token, require_admin_or_agent
-from helpers.signal_notifier import notify_sale_to_signals
-from datetime import datetime, timezone
+from helpers.auth import get_admin_or_agent_token
+from helpers.cache import customer_search_cache
+from helpers.pagination import encode_cursor, decode_cursor
+from helpers.streaming import NDJSON_RESPONSES, ndjson_response
+from helpers.signal_notifier import schedule_sale_notifications
+from worker import notify_sale_task
+from typing import Optional
 from decimal import Decimal
-import json
-
-
-def serialize_for_json(obj):
-    """
-    Recursively convert Pydantic models with Decimal fields to JSON-serializable dicts.
-    Handles nested structures and converts Decimal to string.
-    """
-    if isinstance(obj, list):
-        return [serialize_for_json(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: serialize_for_json(value) for key, value in obj.items()}
-    elif isinstance(obj, Decimal):
-        return str(obj)
-    elif hasattr(obj, 'dict'):
-        # Pydantic model - recursively process
-        data = obj.dict()
-        return serialize_for_json(data)
-    else:
-        return obj
+import logging
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/sales", tags=["pos_sales"])
 
 
 @router.post("/", response_model=SaleResponse)
-async def create_sale(
+def create_sale(
     sale_data: SaleRequest,
-    background_tasks: BackgroundTasks,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Create new sale with transaction to update customer loyalty points."""
-    await require_admin_or_agent(token, db_session)
-
-    # Validate customer exists
-    customer = db_session.get(Customer, sale_data.customer_id)
-    if not customer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Customer not found"
-        )
-
-    # Validate staff exists and is active
+    # Validate staff exists and is active. This is the only read before the write
+    # transaction: the customer is validated by its loyalty points UPDATE below.
+    # (Folding staff into that UPDATE via UPDATE ... FROM staff is not portable:
+    # SQLite cannot RETURNING columns of the FROM table.)
     staff = db_session.get(Staff, sale_data.staff_id)
     if not staff or not staff.is_active:
         raise HTTPException(
@@ -62,18 +43,23 @@ async def create_sale(
             detail="Staff member not found or inactive"
         )
 
-    # Validate payment methods sum equals total amount
-    total_payments = sum(pm.amount for pm in sale_data.payment_methods)
-    if abs(total_payments - sale_data.total_amount) > Decimal('0.01'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Payment methods sum must equal total amount"
-        )
+    # Payment methods sum is validated by SaleRequest before the handler runs
 
     try:
-        # TODO: Generate embedding for sale analysis (requires vector search implementation)
-        # items_text = " ".join([f"{item.name} {item.description}" for item in sale_data.items])
-        # embedding_vector = await generate_embedding(items_text)
+        # Add loyalty points atomically in the database; the same statement proves the
+        # customer exists and RETURNING loads it, so no separate SELECT or refresh is needed.
+        customer_statement = (
+            update(Customer)
+            .where(Customer.id == sale_data.customer_id)
+            .values(loyalty_points=Customer.loyalty_points + Decimal(str(sale_data.loyalty_points_generated)))
+            .returning(Customer)
+        )
+        customer = db_session.exec(customer_statement).scalar_one_or_none()
+        if not customer:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Customer not found"
+            )
 
         # Create sale
         new_sale = Sale(
@@ -83,36 +69,36 @@ async def create_sale(
             discount_amount=sale_data.discount_amount,
             total_amount=sale_data.total_amount,
             loyalty_points_generated=sale_data.loyalty_points_generated,
-            embedding_vector=None,  # Vector search not implemented yet
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc)
+            # JSON-ready lists for the JSONB columns, dumped in one pass by pydantic-core
+            # (Decimals become strings)
+            items=sale_items_adapter.dump_python(sale_data.items, mode="json"),
+            payment_methods=payment_methods_adapter.dump_python(sale_data.payment_methods, mode="json"),
+            embedding_vector=None  # Vector search not implemented yet
         )
 
-        # Set JSON fields using helper methods (serialize Decimals to strings)
-        new_sale.set_items(serialize_for_json(sale_data.items))
-        new_sale.set_payment_methods(serialize_for_json(sale_data.payment_methods))
-
         db_session.add(new_sale)
-        db_session.flush()  # Get sale ID
-
-        # Update customer loyalty points
-        customer.loyalty_points += Decimal(str(sale_data.loyalty_points_generated))
-        customer.updated_at = datetime.now(timezone.utc)
-        db_session.add(customer)
 
         # Commit transaction
         db_session.commit()
-        db_session.refresh(new_sale)
-        db_session.refresh(customer)
+        customer_search_cache.invalidate()  # Loyalty points changed
 
-        # Fire-and-forget webhook notifications
-        background_tasks.add_task(notify_sale_to_signals, new_sale, customer, staff, db_session)
+        # Fire-and-forget signal notifications on the Celery queue, so slow signal
+        # endpoints never hold an HTTP worker. If the broker is unreachable, fall
+        # back to a task on the app's event loop that the response doesn't wait for;
+        # retry=False skips kombu's publish retries so that happens right away.
+        try:
+            notify_sale_task.apply_async((new_sale.id,), retry=False)
+        except Exception as e:
+            logger.error("Could not queue signal notifications for sale %s: %s", new_sale.id, e)
+            schedule_sale_notifications(new_sale.id)
 
-        return SaleResponse(
+        # Every value is either the validated request or read back from the database,
+        # so skip re-validating them
+        return SaleResponse.model_construct(
             id=new_sale.id,
             customer_id=new_sale.customer_id,
             staff_id=new_sale.staff_id,
-            customer=CustomerResponse(
+            customer=CustomerResponse.model_construct(
                 id=customer.id,
                 phone=customer.phone,
                 name=customer.name,
@@ -121,7 +107,7 @@ async def create_sale(
                 created_at=customer.created_at,
                 updated_at=customer.updated_at
             ),
-            staff=StaffResponse(
+            staff=StaffResponse.model_construct(
                 id=staff.id,
                 name=staff.name,
                 schedule=staff.schedule,
@@ -129,16 +115,19 @@ async def create_sale(
                 created_at=staff.created_at,
                 updated_at=staff.updated_at
             ),
-            items=new_sale.get_items(),
+            items=sale_data.items,
             subtotal=new_sale.subtotal,
             discount_amount=new_sale.discount_amount,
             total_amount=new_sale.total_amount,
             loyalty_points_generated=new_sale.loyalty_points_generated,
-            payment_methods=new_sale.get_payment_methods(),
+            payment_methods=sale_data.payment_methods,
             created_at=new_sale.created_at,
             updated_at=new_sale.updated_at
         )
 
+    except HTTPException:
+        db_session.rollback()
+        raise
     except Exception as e:
         db_session.rollback()
         raise HTTPException(
@@ -148,99 +137,126 @@ async def create_sale(
 
 
 @router.get("/", response_model=SaleListResponse)
-async def list_sales(
-    page: int = Query(1, ge=1, description="Page number"),
+def list_sales(
+    page: int = Query(1, ge=1, deprecated=True, description="Page number (OFFSET based, prefer cursor)"),
     page_size: int = Query(20, ge=1, le=100, description="Page size"),
-    token: Token = Depends(get_auth_token),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; takes precedence over page"),
+    approximate_total: bool = Query(False, description="Use the planner's row estimate for total instead of COUNT(*)"),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """List sales with pagination and customer information."""
-    await require_admin_or_agent(token, db_session)
+    # Get total count (runs in the same transaction as the page query below)
+    total_count = None
+    if approximate_total and db_session.get_bind().dialect.name == "postgresql":
+        # Statistics estimate, avoids scanning large tables; -1 until the table is analyzed
+        estimate = db_session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+            {"table": Sale.__tablename__}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            total_count = estimate
+    if total_count is None:
+        total_count = db_session.exec(select(func.count()).select_from(Sale)).one()
 
-    # Calculate offset
-    offset = (page - 1) * page_size
-
-    # Get total count
-    total_statement = select(Sale)
-    total_count = len(db_session.exec(total_statement).all())
-
-    # Get paginated sales with customer and staff information
+    # Get paginated sales; customers and staff are fetched once each by a
+    # follow-up IN query instead of being repeated on every joined row
     statement = (
-        select(Sale, Customer, Staff)
-        .join(Customer, Sale.customer_id == Customer.id)
-        .join(Staff, Sale.staff_id == Staff.id)
-        .order_by(Sale.created_at.desc())
-        .offset(offset)
+        select(Sale)
+        .options(
+            defer(Sale.embedding_vector),  # Never part of the response
+            selectinload(Sale.customer),
+            selectinload(Sale.staff),
+            raiseload("*")  # Any other relationship access is a bug, not a lazy load
+        )
+        .order_by(Sale.created_at.desc(), Sale.id.desc())  # Walks ix_sale_created_id
         .limit(page_size)
     )
+    if cursor:
+        # Keyset pagination: seek past the last row instead of skipping OFFSET rows
+        try:
+            last_created_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        statement = statement.where(tuple_(Sale.created_at, Sale.id) < tuple_(last_created_at, last_id))
+    else:
+        if page > 1:
+            logger.warning("list_sales called with deprecated page=%s; clients should follow next_cursor", page)
+        statement = statement.offset((page - 1) * page_size)
 
-    results = db_session.exec(statement).all()
+    sales = db_session.exec(statement).all()
 
-    sale_responses = []
-    for sale, customer, staff in results:
-        sale_responses.append(SaleResponse(
-            id=sale.id,
-            customer_id=sale.customer_id,
-            staff_id=sale.staff_id,
-            customer=CustomerResponse(
-                id=customer.id,
-                phone=customer.phone,
-                name=customer.name,
-                loyalty_points=customer.loyalty_points,
-                is_active=customer.is_active,
-                created_at=customer.created_at,
-                updated_at=customer.updated_at
-            ),
-            staff=StaffResponse(
-                id=staff.id,
-                name=staff.name,
-                schedule=staff.schedule,
-                is_active=staff.is_active,
-                created_at=staff.created_at,
-                updated_at=staff.updated_at
-            ),
-            items=sale.get_items(),
-            subtotal=sale.subtotal,
-            discount_amount=sale.discount_amount,
-            total_amount=sale.total_amount,
-            loyalty_points_generated=sale.loyalty_points_generated,
-            payment_methods=sale.get_payment_methods(),
-            created_at=sale.created_at,
-            updated_at=sale.updated_at
-        ))
+    # Customer and staff are already loaded, nested responses validate from the same rows
+    sale_responses = [SaleResponse.model_validate(sale) for sale in sales]
+
+    # A full page may have more rows after it
+    next_cursor = None
+    if len(sales) == page_size:
+        last_sale = sales[-1]
+        next_cursor = encode_cursor(last_sale.created_at, last_sale.id)
 
     return SaleListResponse(
         sales=sale_responses,
         total=total_count,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
+@router.get("/stream", response_class=StreamingResponse, responses=NDJSON_RESPONSES)
+def stream_sales(
+    token: Token = Depends(get_admin_or_agent_token),
+    db_session: Session = Depends(get_session)
+):
+    """Stream all sales as newline-delimited JSON, newest first, one sale per line."""
+    # Customers and staff are fetched per batch by IN queries (selectinload works with yield_per)
+    statement = (
+        select(Sale)
+        .options(
+            defer(Sale.embedding_vector),
+            selectinload(Sale.customer),
+            selectinload(Sale.staff),
+            raiseload("*")
+        )
+        .order_by(Sale.created_at.desc(), Sale.id.desc())
+    )
+    return ndjson_response(db_session.get_bind(), statement, SaleResponse)
+
+
 @router.get("/{sale_id}", response_model=SaleResponse)
-async def get_sale(
+def get_sale(
     sale_id: str,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Get detailed information for a specific sale."""
-    await require_admin_or_agent(token, db_session)
-
-    sale = db_session.get(Sale, sale_id)
+    # Load the sale together with its customer and staff in a single query
+    statement = (
+        select(Sale)
+        .options(joinedload(Sale.customer), joinedload(Sale.staff), raiseload("*"))
+        .where(Sale.id == sale_id)
+    )
+    sale = db_session.exec(statement).first()
     if not sale:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sale not found"
         )
 
-    customer = db_session.get(Customer, sale.customer_id)
-    staff = db_session.get(Staff, sale.staff_id)
+    customer = sale.customer
+    staff = sale.staff
 
-    return SaleResponse(
+    # Column values come straight from the database, so skip re-validation; only
+    # the JSON items/payment lists are validated into their schemas
+    return SaleResponse.model_construct(
         id=sale.id,
         customer_id=sale.customer_id,
         staff_id=sale.staff_id,
-        customer=CustomerResponse(
+        customer=CustomerResponse.model_construct(
             id=customer.id,
             phone=customer.phone,
             name=customer.name,
@@ -249,7 +265,7 @@ async def get_sale(
             created_at=customer.created_at,
             updated_at=customer.updated_at
         ) if customer else None,
-        staff=StaffResponse(
+        staff=StaffResponse.model_construct(
             id=staff.id,
             name=staff.name,
             schedule=staff.schedule,
@@ -257,12 +273,12 @@ async def get_sale(
             created_at=staff.created_at,
             updated_at=staff.updated_at
         ) if staff else None,
-        items=sale.get_items(),
+        items=sale_items_adapter.validate_python(sale.items or []),
         subtotal=sale.subtotal,
         discount_amount=sale.discount_amount,
         total_amount=sale.total_amount,
         loyalty_points_generated=sale.loyalty_points_generated,
-        payment_methods=sale.get_payment_methods(),
+        payment_methods=payment_methods_adapter.validate_python(sale.payment_methods or []),
         created_at=sale.created_at,
         updated_at=sale.updated_at
     )
\ No newline at end of file
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 from database import get_session
 from models.auth import Token
@@ -7,35 +9,33 @@ from .schemas.pos_schemas import (
     SignalRequest, SignalResponse, SignalListResponse,
     SignalTestResponse, MessageResponse
 )
-from helpers.auth import get_auth_token, require_admin_or_agent
-from helpers.signal_notifier import test_signal
-from datetime import datetime, timezone
+from helpers.auth import get_admin_or_agent_token
+from helpers.cache import COLLECTION_CACHE_CONTROL, active_signals_cache, collection_etag, etag_matches
+from helpers.signal_notifier import invalidate_signal_headers, test_signal
+from helpers.streaming import NDJSON_RESPONSES, ndjson_response
 
+from typing import Optional
 
 router = APIRouter(prefix="/signals", tags=["pos_signals"])
 
 
 @router.post("/", response_model=SignalResponse, status_code=status.HTTP_201_CREATED)
-async def create_signal(
+def create_signal(
     signal_data: SignalRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Create new signal for sale notifications."""
-    await require_admin_or_agent(token, db_session)
-
     new_signal = SaleSignal(
         name=signal_data.name,
         url=signal_data.url,
         is_active=signal_data.is_active if signal_data.is_active is not None else True,
-        auth_config=signal_data.auth_config or "{}",
-        created_at=datetime.now(timezone.utc),
-        updated_at=datetime.now(timezone.utc)
+        auth_config=signal_data.auth_config or "{}"
     )
 
     db_session.add(new_signal)
     db_session.commit()
-    db_session.refresh(new_signal)
+    active_signals_cache.invalidate()
 
     return SignalResponse(
         id=new_signal.id,
@@ -49,41 +49,44 @@ async def create_signal(
 
 
 @router.get("/", response_model=SignalListResponse)
-async def list_signals(
-    token: Token = Depends(get_auth_token),
+def list_signals(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """List all signals."""
-    await require_admin_or_agent(token, db_session)
+    # Admin UIs reload this on every page view; revalidate with one aggregate query
+    headers = {"ETag": collection_etag(db_session, SaleSignal), "Cache-Control": COLLECTION_CACHE_CONTROL}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
 
     statement = select(SaleSignal).order_by(SaleSignal.created_at.desc())
     signals = db_session.exec(statement).all()
 
-    signal_responses = [
-        SignalResponse(
-            id=signal.id,
-            name=signal.name,
-            url=signal.url,
-            is_active=signal.is_active,
-            auth_config=signal.auth_config,
-            created_at=signal.created_at,
-            updated_at=signal.updated_at
-        )
-        for signal in signals
-    ]
+    signal_responses = [SignalResponse.model_validate(signal) for signal in signals]
 
     return SignalListResponse(signals=signal_responses)
 
 
+@router.get("/stream", response_class=StreamingResponse, responses=NDJSON_RESPONSES)
+def stream_signals(
+    token: Token = Depends(get_admin_or_agent_token),
+    db_session: Session = Depends(get_session)
+):
+    """Stream all signals as newline-delimited JSON, one signal per line."""
+    statement = select(SaleSignal).order_by(SaleSignal.created_at.desc())
+    return ndjson_response(db_session.get_bind(), statement, SignalResponse)
+
+
 @router.get("/{signal_id}", response_model=SignalResponse)
-async def get_signal(
+def get_signal(
     signal_id: str,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Get signal details."""
-    await require_admin_or_agent(token, db_session)
-
     signal = db_session.get(SaleSignal, signal_id)
     if not signal:
         raise HTTPException(
@@ -103,15 +106,13 @@ async def get_signal(
 
 
 @router.put("/{signal_id}", response_model=SignalResponse)
-async def update_signal(
+def update_signal(
     signal_id: str,
     signal_data: SignalRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Update signal."""
-    await require_admin_or_agent(token, db_session)
-
     signal = db_session.get(SaleSignal, signal_id)
     if not signal:
         raise HTTPException(
@@ -123,11 +124,11 @@ async def update_signal(
     signal.url = signal_data.url
     signal.is_active = signal_data.is_active if signal_data.is_active is not None else signal.is_active
     signal.auth_config = signal_data.auth_config or "{}"
-    signal.updated_at = datetime.now(timezone.utc)
 
     db_session.add(signal)
     db_session.commit()
-    db_session.refresh(signal)
+    active_signals_cache.invalidate()
+    invalidate_signal_headers(signal.id)
 
     return SignalResponse(
         id=signal.id,
@@ -141,14 +142,12 @@ async def update_signal(
 
 
 @router.delete("/{signal_id}", response_model=MessageResponse)
-async def delete_signal(
+def delete_signal(
     signal_id: str,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Delete signal (hard delete)."""
-    await require_admin_or_agent(token, db_session)
-
     signal = db_session.get(SaleSignal, signal_id)
     if not signal:
         raise HTTPException(
@@ -158,6 +157,8 @@ async def delete_signal(
 
     db_session.delete(signal)
     db_session.commit()
+    active_signals_cache.invalidate()
+    invalidate_signal_headers(signal_id)
 
     return MessageResponse(message="Signal deleted successfully")
 
@@ -165,13 +166,12 @@ async def delete_signal(
 @router.post("/{signal_id}/test", response_model=SignalTestResponse)
 async def test_signal_endpoint(
     signal_id: str,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Test signal with dummy sale data."""
-    await require_admin_or_agent(token, db_session)
-
-    signal = db_session.get(SaleSignal, signal_id)
+    # Async for the HTTP call below; the blocking lookup runs in the threadpool
+    signal = await run_in_threadpool(db_session.get, SaleSignal, signal_id)
     if not signal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
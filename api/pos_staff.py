@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 from database import get_session
 from models.auth import Token
@@ -6,58 +7,61 @@ from models.pos_models import Staff
 from .schemas.pos_schemas import (
     StaffRequest, StaffResponse, StaffListResponse, MessageResponse
 )
-from helpers.auth import get_auth_token, require_admin_or_agent
-from datetime import datetime, timezone
+from helpers.auth import get_admin_or_agent_token
+from helpers.cache import COLLECTION_CACHE_CONTROL, collection_etag, etag_matches
+from helpers.streaming import NDJSON_RESPONSES, ndjson_response
+from typing import Optional
 
 router = APIRouter(prefix="/staff", tags=["pos_staff"])
 
 
 @router.get("/", response_model=StaffListResponse)
-async def list_staff(
-    token: Token = Depends(get_auth_token),
+def list_staff(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """List all active staff members."""
-    await require_admin_or_agent(token, db_session)
+    # Admin UIs reload this on every page view; revalidate with one aggregate query
+    headers = {"ETag": collection_etag(db_session, Staff), "Cache-Control": COLLECTION_CACHE_CONTROL}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
 
     statement = select(Staff).where(Staff.is_active == True).order_by(Staff.name)
     staff_members = db_session.exec(statement).all()
 
-    staff_responses = [
-        StaffResponse(
-            id=staff.id,
-            name=staff.name,
-            schedule=staff.schedule,
-            is_active=staff.is_active,
-            created_at=staff.created_at,
-            updated_at=staff.updated_at
-        )
-        for staff in staff_members
-    ]
+    staff_responses = [StaffResponse.model_validate(staff) for staff in staff_members]
 
     return StaffListResponse(staff=staff_responses)
 
 
+@router.get("/stream", response_class=StreamingResponse, responses=NDJSON_RESPONSES)
+def stream_staff(
+    token: Token = Depends(get_admin_or_agent_token),
+    db_session: Session = Depends(get_session)
+):
+    """Stream all active staff members as newline-delimited JSON, one member per line."""
+    statement = select(Staff).where(Staff.is_active == True).order_by(Staff.name)
+    return ndjson_response(db_session.get_bind(), statement, StaffResponse)
+
+
 @router.post("/", response_model=StaffResponse)
-async def create_staff(
+def create_staff(
     staff_data: StaffRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Create new staff member."""
-    await require_admin_or_agent(token, db_session)
-
     new_staff = Staff(
         name=staff_data.name,
         schedule=staff_data.schedule or "{}",
-        is_active=True,
-        created_at=datetime.now(timezone.utc),
-        updated_at=datetime.now(timezone.utc)
+        is_active=True
     )
 
     db_session.add(new_staff)
     db_session.commit()
-    db_session.refresh(new_staff)
 
     return StaffResponse(
         id=new_staff.id,
@@ -70,15 +74,13 @@ async def create_staff(
 
 
 @router.put("/{staff_id}", response_model=StaffResponse)
-async def update_staff(
+def update_staff(
     staff_id: str,
     staff_data: StaffRequest,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Update staff member."""
-    await require_admin_or_agent(token, db_session)
-
     staff = db_session.get(Staff, staff_id)
     if not staff:
         raise HTTPException(
@@ -89,11 +91,9 @@ async def update_staff(
     # Update staff data
     staff.name = staff_data.name
     staff.schedule = staff_data.schedule or "{}"
-    staff.updated_at = datetime.now(timezone.utc)
 
     db_session.add(staff)
     db_session.commit()
-    db_session.refresh(staff)
 
     return StaffResponse(
         id=staff.id,
@@ -106,14 +106,12 @@ async def update_staff(
 
 
 @router.delete("/{staff_id}", response_model=MessageResponse)
-async def delete_staff(
+def delete_staff(
     staff_id: str,
-    token: Token = Depends(get_auth_token),
+    token: Token = Depends(get_admin_or_agent_token),
     db_session: Session = Depends(get_session)
 ):
     """Soft delete staff member by setting is_active=False."""
-    await require_admin_or_agent(token, db_session)
-
     staff = db_session.get(Staff, staff_id)
     if not staff:
         raise HTTPException(
@@ -122,7 +120,6 @@ async def delete_staff(
         )
 
     staff.is_active = False
-    staff.updated_at = datetime.now(timezone.utc)
 
     db_session.add(staff)
     db_session.commit()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, model_validator
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
@@ -14,6 +14,10 @@ class StaffRequest(BaseModel):
 
 class StaffResponse(BaseModel):
     """Schema for staff response."""
+    # Fields mirror the table model, so endpoints can model_validate() ORM rows.
+    # Responses are frozen: cached ones are shared between requests.
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: str = Field(..., description="Staff ID")
     name: str = Field(..., description="Staff member name")
     schedule: str = Field(..., description="Staff schedule as JSON string")
@@ -24,6 +28,8 @@ class StaffResponse(BaseModel):
 
 class StaffListResponse(BaseModel):
     """Schema for staff list response."""
+    model_config = ConfigDict(frozen=True)
+
     staff: List[StaffResponse] = Field(..., description="List of staff members")
 
 
@@ -34,8 +40,15 @@ class CustomerRequest(BaseModel):
     name: Optional[str] = Field(default=None, description="Customer name")
 
 
+class CustomerBulkRequest(BaseModel):
+    """Schema for creating customers in bulk."""
+    customers: List[CustomerRequest] = Field(..., min_length=1, description="Customers to create")
+
+
 class CustomerResponse(BaseModel):
     """Schema for customer response."""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: str = Field(..., description="Customer ID")
     phone: str = Field(..., description="Customer phone number")
     name: Optional[str] = Field(default=None, description="Customer name")
@@ -52,6 +65,8 @@ class CustomerWalletRequest(BaseModel):
 
 class CustomerSearchResponse(BaseModel):
     """Schema for customer search response."""
+    model_config = ConfigDict(frozen=True)
+
     customers: List[CustomerResponse] = Field(..., description="List of matching customers")
 
 
@@ -67,8 +82,15 @@ class ProductRequest(BaseModel):
     meta_data: Optional[str] = Field(default="{}", description="JSON metadata")
 
 
+class ProductBulkRequest(BaseModel):
+    """Schema for creating products in bulk."""
+    products: List[ProductRequest] = Field(..., min_length=1, description="Products to create")
+
+
 class ProductResponse(BaseModel):
     """Schema for product response."""
+    model_config = ConfigDict(frozen=True)
+
     id: str = Field(..., description="Product ID")
     name: str = Field(..., description="Product name")
     description: Optional[str] = Field(default=None, description="Product description")
@@ -84,30 +106,16 @@ class ProductResponse(BaseModel):
 
 class ProductSearchResponse(BaseModel):
     """Schema for product search response."""
+    model_config = ConfigDict(frozen=True)
+
     products: List[ProductResponse] = Field(..., description="List of matching products")
 
 
 # Sale Item Schemas
-class SaleItemBase(BaseModel):
-    """Base schema for sale items."""
-    type: str = Field(..., description="Item type: product, other, discount")
-    product_id: Optional[str] = Field(default=None, description="Product ID if type is product")
-    name: str = Field(..., description="Item name")
-    description: str = Field(..., description="Item description")
-    unit_price: Decimal = Field(..., description="Unit price")
-    quantity: int = Field(..., description="Quantity")
-    total: Decimal = Field(..., description="Total amount")
-
-
-class SaleItemDiscount(SaleItemBase):
-    """Schema for discount sale items."""
-    discount_type: str = Field(..., description="Discount type: percentage, fixed")
-    discount_value: Decimal = Field(..., description="Discount value")
-    applied_to_amount: Decimal = Field(..., description="Amount discount was applied to")
-
-
 class SaleItem(BaseModel):
-    """Schema for sale items (union of base and discount)."""
+    """Schema for sale items; discount fields are only set when type is discount."""
+    model_config = ConfigDict(frozen=True)
+
     type: str = Field(..., description="Item type: product, other, discount")
     product_id: Optional[str] = Field(default=None, description="Product ID if type is product")
     name: str = Field(..., description="Item name")
@@ -123,11 +131,19 @@ class SaleItem(BaseModel):
 # Payment Method Schemas
 class PaymentMethodItem(BaseModel):
     """Schema for payment method items."""
+    model_config = ConfigDict(frozen=True)
+
     method: PaymentMethod = Field(..., description="Payment method")
     amount: Decimal = Field(..., description="Payment amount")
     reference: Optional[str] = Field(default=None, description="Payment reference")
 
 
+# Dump and validate the lists stored in the Sale.items / Sale.payment_methods
+# JSON columns in one pass.
+sale_items_adapter = TypeAdapter(List[SaleItem])
+payment_methods_adapter = TypeAdapter(List[PaymentMethodItem])
+
+
 # Sale Schemas
 class SaleRequest(BaseModel):
     """Schema for creating sale."""
@@ -140,18 +156,20 @@ class SaleRequest(BaseModel):
     loyalty_points_generated: int = Field(default=0, description="Loyalty points generated")
     payment_methods: List[PaymentMethodItem] = Field(..., description="Payment methods used")
 
-    @validator('payment_methods')
-    def validate_payment_methods(cls, v, values):
+    @model_validator(mode='after')
+    def validate_payment_methods(self):
         """Validate that payment methods sum equals total amount."""
-        if 'total_amount' in values:
-            total_payments = sum(pm.amount for pm in v)
-            if abs(total_payments - values['total_amount']) > Decimal('0.01'):
-                raise ValueError('Payment methods sum must equal total amount')
-        return v
+        # Tolerate one cent of rounding, compared exactly in Decimal
+        total_payments = sum(pm.amount for pm in self.payment_methods)
+        if abs(total_payments - self.total_amount) > Decimal("0.01"):
+            raise ValueError('Payment methods sum must equal total amount')
+        return self
 
 
 class SaleResponse(BaseModel):
     """Schema for sale response."""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: str = Field(..., description="Sale ID")
     customer_id: str = Field(..., description="Customer ID")
     staff_id: str = Field(..., description="Staff ID")
@@ -169,10 +187,13 @@ class SaleResponse(BaseModel):
 
 class SaleListResponse(BaseModel):
     """Schema for sale list response."""
+    model_config = ConfigDict(frozen=True)
+
     sales: List[SaleResponse] = Field(..., description="List of sales")
-    total: int = Field(..., description="Total number of sales")
+    total: int = Field(..., description="Total number of sales (an estimate when approximate_total is set)")
     page: int = Field(..., description="Current page")
     page_size: int = Field(..., description="Page size")
+    next_cursor: Optional[str] = Field(default=None, description="Cursor for the next page, if there may be one")
 
 
 # Signal Schemas
@@ -186,6 +207,8 @@ class SignalRequest(BaseModel):
 
 class SignalResponse(BaseModel):
     """Schema for signal response."""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: str = Field(..., description="Signal ID")
     name: str = Field(..., description="Signal name")
     url: str = Field(..., description="Signal URL")
@@ -197,11 +220,15 @@ class SignalResponse(BaseModel):
 
 class SignalListResponse(BaseModel):
     """Schema for signal list response."""
+    model_config = ConfigDict(frozen=True)
+
     signals: List[SignalResponse] = Field(..., description="List of signals")
 
 
 class SignalTestResponse(BaseModel):
     """Schema for signal test response."""
+    model_config = ConfigDict(frozen=True)
+
     success: bool = Field(..., description="Test success status")
     status_code: Optional[int] = Field(default=None, description="HTTP status code")
     response_body: Optional[str] = Field(default=None, description="Response body")
@@ -211,4 +238,6 @@ class SignalTestResponse(BaseModel):
 # Message Schemas
 class MessageResponse(BaseModel):
     """Schema for API response messages."""
+    model_config = ConfigDict(frozen=True)
+
     message: str = Field(..., description="Response message")
\ No newline at end of file
@@ -1,18 +1,57 @@
 from sqlmodel import Session, create_engine
+from sqlalchemy import event
 from typing import Generator
 import redis
-from settings import DATABASE_URL, REDIS_URL
+from settings import (
+    DATABASE_URL, REDIS_URL, REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT, REDIS_CONNECT_TIMEOUT,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE
+)
 
-engine = create_engine(DATABASE_URL, echo=False)
-redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+if DATABASE_URL.startswith("postgresql"):
+    engine = create_engine(
+        DATABASE_URL,
+        echo=False,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE
+    )
+else:
+    # Pooled connections are handed to different threadpool workers
+    engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_wal(dbapi_connection, connection_record):
+        """Use WAL so readers don't block on a writing sale."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+redis_client = redis.from_url(
+    REDIS_URL,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_CONNECT_TIMEOUT
+)
 
 
 def get_session() -> Generator[Session, None, None]:
     """Database session dependency for FastAPI dependency injection."""
-    with Session(engine) as session:
+    # Keep loaded attributes after commit so handlers can build responses without a refresh
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
 
+def warm_connection_pool():
+    """Open pool_size connections up front so the first requests don't pay for connecting."""
+    if engine.dialect.name != "postgresql":
+        return
+    connections = [engine.connect() for _ in range(engine.pool.size())]
+    for connection in connections:
+        connection.close()  # Returned to the pool, kept open
+
+
 def get_redis() -> redis.Redis:
     """Redis client dependency for FastAPI dependency injection."""
     return redis_client
\ No newline at end of file
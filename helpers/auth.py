@@ -1,40 +1,148 @@
 from fastapi import Depends, HTTPException, status, Header
 from sqlmodel import Session, select
+from sqlalchemy import bindparam
 from sqlalchemy.orm import joinedload
-from models.auth import Token, Agent, TokenUser, TokenAgent, User
-from database import get_session
+from models.auth import Token, Agent, TokenUser, TokenAgent, User, UserRole
+from database import get_session, redis_client
 from datetime import datetime, timezone
+import hashlib
+import logging
+import time
+import orjson
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Authenticated tokens are cached in Redis under this prefix plus the token's
+# SHA-256, so the bearer tokens themselves are never stored as keys. Tokens are
+# revoked by the main system, not this service, so entries expire after at most
+# TOKEN_CACHE_MAX_TTL seconds to bound how long a revoked token stays usable.
+TOKEN_CACHE_PREFIX = "tok:"
+TOKEN_CACHE_MAX_TTL = 60
+
+BEARER_PREFIX = "Bearer "
+BEARER_PREFIX_LEN = len(BEARER_PREFIX)
+
+# Single query with joins to load Token with User and Agent relationships. Built
+# once at import; each request only binds the token string and current time.
+AUTH_TOKEN_STATEMENT = (
+    select(Token)
+    .options(
+        joinedload(Token.token_users).joinedload(TokenUser.user),
+        joinedload(Token.token_agents).joinedload(TokenAgent.agent)
+    )
+    .where(
+        Token.access_token == bindparam("access_token"),
+        Token.is_revoked == False,
+        Token.expires_at > bindparam("now")
+    )
+)
+
+
+# (epoch second, aware UTC datetime) for _now_utc
+_now_cache = [0, None]
+
 
+def _now_utc() -> datetime:
+    """Current UTC time truncated to the second, reused within that second.
 
-async def get_auth_token(
+    Token expiry checks tolerate a second of staleness, so most requests skip
+    building a new aware datetime.
+    """
+    second = int(time.time())
+    if _now_cache[0] != second:
+        _now_cache[1] = datetime.fromtimestamp(second, timezone.utc)
+        _now_cache[0] = second
+    return _now_cache[1]
+
+
+def _token_cache_key(token_string: str) -> str:
+    """Redis key for a token: its SHA-256, never the token itself."""
+    return TOKEN_CACHE_PREFIX + hashlib.sha256(token_string.encode()).hexdigest()
+
+
+def _load_cached_token(token_string: str) -> Token | None:
+    """Rebuild a Token with its user/agent from the Redis cache, or None on a miss."""
+    try:
+        cached = redis_client.get(_token_cache_key(token_string))
+    except redis.RedisError as e:
+        logger.warning("Token cache unavailable: %s", e)
+        return None
+    if not cached:
+        return None
+
+    data = orjson.loads(cached)
+    token = Token.model_validate(data["token"])
+    if data["user"]:
+        token.token_users = [TokenUser(token_id=token.id, user_id=data["user"]["id"], user=User.model_validate(data["user"]))]
+    if data["agent"]:
+        token.token_agents = [TokenAgent(token_id=token.id, agent_id=data["agent"]["id"], agent=Agent.model_validate(data["agent"]))]
+    return token
+
+
+def _cache_token(token_string: str, token: Token):
+    """Store an authenticated token with its user/agent until it expires (capped)."""
+    expires_at = token.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    ttl = min(int((expires_at - datetime.now(timezone.utc)).total_seconds()), TOKEN_CACHE_MAX_TTL)
+    if ttl <= 0:
+        return
+
+    user, agent = token.user, token.agent
+    payload = orjson.dumps({
+        "token": token.model_dump(),
+        # The password hash is never needed to authorize a request; keep it out of Redis
+        "user": {**user.model_dump(), "hashed_password": ""} if user else None,
+        "agent": agent.model_dump() if agent else None
+    })
+    try:
+        redis_client.setex(_token_cache_key(token_string), ttl, payload)
+    except redis.RedisError as e:
+        logger.warning("Token cache unavailable: %s", e)
+
+
+def invalidate_cached_token(token_string: str):
+    """Drop a token from the cache, e.g. right after revoking it."""
+    try:
+        redis_client.delete(_token_cache_key(token_string))
+    except redis.RedisError as e:
+        logger.warning("Token cache unavailable: %s", e)
+
+
+def get_auth_token(
     authorization: str = Header(),
     db_session: Session = Depends(get_session)
 ) -> Token:
-    """Extract and validate token from Authorization header, returning Token object with relationships loaded."""
+    """Extract and validate token from Authorization header, returning Token object with relationships loaded.
 
-    if not authorization.startswith("Bearer "):
+    Plain def so FastAPI runs the blocking token query in its threadpool.
+    """
+
+    if not authorization.startswith(BEARER_PREFIX):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authorization header format"
         )
 
-    token_string = authorization.split(" ")[1]
-
-    # Single query with joins to load Token with User and Agent relationships
-    statement = (
-        select(Token)
-        .options(
-            joinedload(Token.token_users).joinedload(TokenUser.user),
-            joinedload(Token.token_agents).joinedload(TokenAgent.agent)
-        )
-        .where(
-            Token.access_token == token_string,
-            Token.is_revoked == False,
-            Token.expires_at > datetime.now(timezone.utc)
+    token_string = authorization[BEARER_PREFIX_LEN:]
+    if not token_string:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
         )
-    )
 
-    token = db_session.exec(statement).first()
+    # Most requests reuse a recently validated token, skip the query for those
+    cached_token = _load_cached_token(token_string)
+    if cached_token is not None:
+        # Guards read these flags instead of walking the relationships again
+        cached_token._auth_flags = _compute_token_flags(cached_token)
+        return cached_token
+
+    token = db_session.exec(
+        AUTH_TOKEN_STATEMENT,
+        params={"access_token": token_string, "now": _now_utc()}
+    ).first()
 
     if not token:
         raise HTTPException(
@@ -42,6 +150,8 @@ async def get_auth_token(
             detail="Invalid or expired token"
         )
 
+    _cache_token(token_string, token)
+    token._auth_flags = _compute_token_flags(token)
     return token
 
 
@@ -50,23 +160,50 @@ def get_user_from_token(token: Token, db_session: Session = None) -> User | None
     return token.user
 
 
+# Token capability flags, computed once per check by _token_flags
+HAS_USER = 1
+HAS_AGENT = 2
+IS_ADMIN = 4
+USER_ACTIVE = 8
+AGENT_ACTIVE = 16
+
+
+def _token_flags(token: Token) -> int:
+    """Bitmask of the token's user/agent facts, as precomputed by get_auth_token."""
+    flags = getattr(token, "_auth_flags", None)
+    if flags is None:
+        flags = _compute_token_flags(token)
+    return flags
+
+
+def _compute_token_flags(token: Token) -> int:
+    """Build the flags bitmask, reading each relationship once."""
+    user, agent = token.user, token.agent
+    flags = 0
+    if user:
+        flags |= HAS_USER
+        if user.role == UserRole.ADMIN:
+            flags |= IS_ADMIN
+        if user.is_active:
+            flags |= USER_ACTIVE
+    if agent:
+        flags |= HAS_AGENT
+        if agent.is_active:
+            flags |= AGENT_ACTIVE
+    return flags
+
+
+def _forbidden(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
 async def require_admin(
     token: Token,
     db_session: Session = None
 ) -> None:
     """Validate that the authenticated user is an admin. Raises 403 if not admin."""
-
-    # Get user from token (using preloaded relationship)
-    from models.auth import UserRole
-    user = token.user
-
-    if user and user.role == UserRole.ADMIN:
-        return  # User is admin, allow access
-
-    raise HTTPException(
-        status_code=status.HTTP_403_FORBIDDEN,
-        detail="Admin access required"
-    )
+    if not _token_flags(token) & IS_ADMIN:
+        raise _forbidden("Admin access required")
 
 
 async def require_admin_or_self(
@@ -75,26 +212,15 @@ async def require_admin_or_self(
     db_session: Session = None
 ) -> None:
     """Validate that the authenticated user is admin or owns the user_id. Raises 403 if neither."""
+    flags = _token_flags(token)
 
-    # Get user from token (using preloaded relationship)
-    from models.auth import UserRole
-    user = token.user
-
-    if not user:
+    if not flags & HAS_USER:
         # Token might be associated with an agent, not a user
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User access required"
-        )
+        raise _forbidden("User access required")
 
     # Check if user is admin OR if they're updating their own profile
-    if user.role == UserRole.ADMIN or user.id == user_id:
-        return  # Allow access
-
-    raise HTTPException(
-        status_code=status.HTTP_403_FORBIDDEN,
-        detail="Admin access required or can only update own profile"
-    )
+    if not flags & IS_ADMIN and token.user.id != user_id:
+        raise _forbidden("Admin access required or can only update own profile")
 
 
 async def require_user_or_agent(
@@ -102,27 +228,16 @@ async def require_user_or_agent(
     db_session: Session = None
 ) -> None:
     """Validate that the token is associated with either a user or an agent. Raises 403 if neither."""
+    flags = _token_flags(token)
 
-    # Token must be associated with either a user or agent
-    if not token.user and not token.agent:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Valid user or agent authentication required"
-        )
-
-    # If it's a user, they must be active
-    if token.user and not token.user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User account is inactive"
-        )
+    if not flags & (HAS_USER | HAS_AGENT):
+        raise _forbidden("Valid user or agent authentication required")
 
-    # If it's an agent, they must be active
-    if token.agent and not token.agent.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Agent is inactive"
-        )
+    # Users and agents must be active
+    if flags & HAS_USER and not flags & USER_ACTIVE:
+        raise _forbidden("User account is inactive")
+    if flags & HAS_AGENT and not flags & AGENT_ACTIVE:
+        raise _forbidden("Agent is inactive")
 
 
 def can_access_all_channels(token: Token) -> bool:
@@ -131,81 +246,75 @@ def can_access_all_channels(token: Token) -> bool:
     Returns:
         True if ADMIN user or any AGENT, False if MEMBER user
     """
-    from models.auth import UserRole
-
-    # Agents can access all channels
-    if token.agent:
-        return True
-
-    # Admin users can access all channels
-    if token.user and token.user.role == UserRole.ADMIN:
-        return True
-
-    # Member users need explicit permissions
-    return False
+    # Agents and admin users can access all channels; members need explicit permissions
+    return bool(_token_flags(token) & (HAS_AGENT | IS_ADMIN))
 
 
 async def require_admin_or_agent(
     token: Token,
     db_session: Session = None
 ) -> None:
-    """Validate that the token is associated with an admin user or any agent. Raises 403 if neither."""
-    from models.auth import UserRole
-
-    # Check if it's an agent (agents can perform admin-like operations)
-    if token.agent:
-        if not token.agent.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Agent is inactive"
-            )
-        return  # Active agent can proceed
-
-    # Check if it's an admin user
-    if token.user:
-        if not token.user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User account is inactive"
-            )
-        if token.user.role == UserRole.ADMIN:
-            return  # Admin user can proceed
-
-    # Neither admin user nor agent
-    raise HTTPException(
-        status_code=status.HTTP_403_FORBIDDEN,
-        detail="Admin or agent access required"
-    )
+    """Validate that the token is associated with an admin user or any agent. Raises 403 if neither.
+
+    Only reads the user/agent relationships preloaded by get_auth_token, so it issues no queries.
+    """
+    flags = _token_flags(token)
+
+    # Agents can perform admin-like operations if active
+    if flags & HAS_AGENT:
+        if not flags & AGENT_ACTIVE:
+            raise _forbidden("Agent is inactive")
+        return
+
+    if flags & HAS_USER and not flags & USER_ACTIVE:
+        raise _forbidden("User account is inactive")
+    if not flags & IS_ADMIN:
+        raise _forbidden("Admin or agent access required")
+
+
+async def get_admin_or_agent_token(token: Token = Depends(get_auth_token)) -> Token:
+    """Dependency returning the authenticated token once it passes require_admin_or_agent.
+
+    FastAPI resolves it once per request, so handlers declare it instead of
+    repeating the guard call in their body.
+    """
+    await require_admin_or_agent(token)
+    return token
 
 
 def check_channel_access(token: Token, channel, db_session: Session):
-    """Helper function to check if token holder can access the channel."""
+    """Helper function to check if token holder can access the channel.
+
+    Permission lookups are memoized on the token, which lives for one request.
+    """
     if can_access_all_channels(token):
         # Admin users and agents can access any channel
         return
 
-    # Member users need explicit permission
-    # Get user from token_users relationship
-    from models.auth import TokenUser
-    from models.channels import UserChannelPermission
-    token_user_statement = select(TokenUser).where(TokenUser.token_id == token.id)
-    token_user = db_session.exec(token_user_statement).first()
-
-    if not token_user:
+    # Member users need explicit permission; the user is preloaded by get_auth_token
+    user = token.user
+    if not user:
         raise HTTPException(
             status_code=403,
             detail="User access required for this channel"
         )
 
-    # Check if user has explicit permission to this channel
-    permission_statement = select(UserChannelPermission).where(
-        UserChannelPermission.user_id == token_user.user_id,
-        UserChannelPermission.channel_id == channel.id
-    )
-    permission = db_session.exec(permission_statement).first()
-
-    if not permission:
+    channel_access = getattr(token, "_channel_access", None)
+    if channel_access is None:
+        channel_access = {}
+        token._channel_access = channel_access
+
+    if channel.id not in channel_access:
+        # Check if user has explicit permission to this channel
+        from models.channels import UserChannelPermission
+        permission_statement = select(UserChannelPermission.id).where(
+            UserChannelPermission.user_id == user.id,
+            UserChannelPermission.channel_id == channel.id
+        ).limit(1)
+        channel_access[channel.id] = db_session.exec(permission_statement).first() is not None
+
+    if not channel_access[channel.id]:
         raise HTTPException(
             status_code=403,
             detail="No permission to access this channel"
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,88 @@
+"""
+Cache Helper
+
+Small in-process TTL + LRU cache for repeated admin searches. Entries are
+per worker process; writes call invalidate() so the next search is fresh.
+
+Also ETag helpers for HTTP caching of small, rarely changing collections.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+# Short client-side cache for admin UI collections; revalidated with the ETag
+COLLECTION_CACHE_CONTROL = "private, max-age=30"
+
+
+class SearchCache:
+    """LRU cache whose entries expire after ttl seconds; safe to share across threads."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        # Sync handlers run on the threadpool and share one instance per process
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every entry; call after writes to the cached table."""
+        with self._lock:
+            self._entries.clear()
+
+
+customer_search_cache = SearchCache()
+product_search_cache = SearchCache()
+# Active sale signals, read on every sale notification; a single "active" entry.
+# Signal writes invalidate it in this process, other processes (Celery workers)
+# pick up changes within the ttl.
+active_signals_cache = SearchCache(maxsize=1, ttl=30.0)
+
+
+def collection_etag(db_session: Session, model) -> str:
+    """
+    Weak ETag for a table, from MAX(updated_at) and the row count.
+
+    The count catches hard deletes, which leave MAX(updated_at) unchanged.
+    """
+    latest, count = db_session.exec(
+        select(func.max(model.updated_at), func.count()).select_from(model)
+    ).one()
+    digest = hashlib.sha1(f"{latest}|{count}".encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
@@ -0,0 +1,20 @@
+"""
+Database Helper
+
+Dialect-aware statement builders shared by the API routers.
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session
+
+
+def dialect_insert(db_session: Session, model):
+    """
+    Build an INSERT for model using the session's backend dialect.
+
+    Unlike the generic insert(), the result supports on_conflict_do_update /
+    on_conflict_do_nothing on both PostgreSQL and SQLite.
+    """
+    if db_session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -0,0 +1,20 @@
+"""
+Search Helper
+
+Utilities shared by the search endpoints to build safe LIKE patterns.
+"""
+
+LIKE_ESCAPE = "\\"
+
+
+def escape_like(value: str) -> str:
+    """
+    Escape LIKE wildcards so user input is matched literally.
+
+    Use together with `escape=LIKE_ESCAPE` on `.like()` / `.ilike()`.
+    """
+    return (
+        value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace("%", f"{LIKE_ESCAPE}%")
+        .replace("_", f"{LIKE_ESCAPE}_")
+    )
@@ -5,22 +5,80 @@ Handles signal notifications for sale events.
 Sends sale data to all active signals using fire-and-forget approach.
 """
 
+import asyncio
+import anyio.from_thread
+import base64
 import httpx
-import json
+import orjson
+import time
+import weakref
+from pydantic import BaseModel, ConfigDict
 from sqlmodel import Session, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+from database import engine
+from helpers.cache import active_signals_cache
 from models.pos_models import SaleSignal, Sale, Customer, Staff
-from decimal import Decimal
-from datetime import datetime
+from models.helper import utc_now
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-request timeout for signal posts; sales fan out in the background, so a
+# slow endpoint is given up on (and counted by its breaker) rather than waited on
+SIGNAL_TIMEOUT = 3.0
+
+# One pooled client per event loop (the API loop, or a Celery worker's loop), so
+# signal calls reuse keep-alive connections instead of a new handshake each time.
+# HTTP/2 multiplexes concurrent posts to one host over a single connection;
+# servers that don't negotiate h2 get HTTP/1.1.
+# httpx clients can't be shared across loops, hence the mapping.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared signal HTTP client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=True,
+            timeout=SIGNAL_TIMEOUT,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+        )
+        _http_clients[loop] = client
+    return client
+
+
+# Cap on in-flight signal posts per event loop, so bursts of sales can't exhaust
+# sockets; asyncio semaphores are bound to one loop, like the client
+MAX_CONCURRENT_SIGNAL_POSTS = 64
+_post_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_post_semaphore() -> asyncio.Semaphore:
+    """Return the signal post semaphore for the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _post_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SIGNAL_POSTS)
+        _post_semaphores[loop] = semaphore
+    return semaphore
+
+
+async def close_http_client():
+    """Close the running event loop's signal HTTP client, if one was created."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
 
 def generate_sale_signal_payload(sale: Sale, customer: Customer, staff: Staff) -> dict:
     """
     Generate signal payload from sale data.
 
-    Returns JSON-serializable dict with complete sale information.
+    Returns JSON-serializable dict with complete sale information. Amounts use
+    fixed-point notation, never exponents (str(Decimal("1E+2")) is "1E+2").
     """
     return {
         "sale_id": sale.id,
@@ -28,18 +86,18 @@ def generate_sale_signal_payload(sale: Sale, customer: Customer, staff: Staff) -
             "id": customer.id,
             "phone": customer.phone,
             "name": customer.name,
-            "loyalty_points": str(customer.loyalty_points),
+            "loyalty_points": format(customer.loyalty_points, 'f'),
         },
         "staff": {
             "id": staff.id,
             "name": staff.name,
         },
-        "items": sale.get_items(),
-        "subtotal": str(sale.subtotal),
-        "discount_amount": str(sale.discount_amount),
-        "total_amount": str(sale.total_amount),
+        "items": sale.items,
+        "subtotal": format(sale.subtotal, 'f'),
+        "discount_amount": format(sale.discount_amount, 'f'),
+        "total_amount": format(sale.total_amount, 'f'),
         "loyalty_points_generated": sale.loyalty_points_generated,
-        "payment_methods": sale.get_payment_methods(),
+        "payment_methods": sale.payment_methods,
         "created_at": sale.created_at.isoformat(),
     }
 
@@ -70,65 +128,373 @@ def apply_signal_auth(headers: dict, auth_config: dict) -> dict:
     elif auth_type == "basic":
         username = auth_config.get("username", "")
         password = auth_config.get("password", "")
-        import base64
         credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
         headers["Authorization"] = f"Basic {credentials}"
 
     return headers
 
 
-async def notify_single_signal(signal: SaleSignal, payload: dict):
+class ActiveSignal(BaseModel):
+    """Immutable snapshot of the SaleSignal fields the notifier reads.
+
+    Cached process-wide and shared across threads and sessions, so it holds
+    plain values instead of a detached ORM instance.
     """
-    Notify a single signal with sale data.
+    model_config = ConfigDict(frozen=True)
+
+    id: str
+    name: str
+    url: str
+    auth_config: str
+
+    def get_auth_config(self) -> dict:
+        """Parse auth_config JSON string to Python dict."""
+        return orjson.loads(self.auth_config) if self.auth_config else {}
+
+
+ACTIVE_SIGNAL_COLUMNS = (SaleSignal.id, SaleSignal.name, SaleSignal.url, SaleSignal.auth_config)
+
 
-    Fire-and-forget: errors are logged but don't raise exceptions.
+# Finished request headers per signal, keyed by signal.id and stored with the
+# auth_config they were built from, so an edited signal rebuilds them
+_headers_cache: dict[str, tuple[str, dict]] = {}
+
+
+def get_signal_headers(signal: ActiveSignal) -> dict:
+    """Return the request headers for a signal, building them once per auth config."""
+    cached = _headers_cache.get(signal.id)
+    if cached is not None and cached[0] == signal.auth_config:
+        return cached[1]
+    headers = apply_signal_auth({"Content-Type": "application/json"}, signal.get_auth_config())
+    _headers_cache[signal.id] = (signal.auth_config, headers)
+    return headers
+
+
+def invalidate_signal_headers(signal_id: str):
+    """Drop a signal's cached headers, e.g. after it is updated or deleted."""
+    _headers_cache.pop(signal_id, None)
+
+
+# Per-signal circuit breaker, kept in memory: after BREAKER_FAILURE_THRESHOLD
+# consecutive failures a signal is skipped for BREAKER_COOLDOWN seconds. Then it is
+# half-open: the first caller gets to probe it and the cooldown restarts, so every
+# other caller keeps skipping it until the probe's outcome is recorded (or, if the
+# probe never reports, until the next cooldown hands out a new probe).
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+_breakers: dict[str, dict] = {}
+
+
+def _breaker_open(signal_id: str) -> bool:
+    """Whether to skip the signal; claims the single probe once the cooldown is over."""
+    breaker = _breakers.get(signal_id)
+    if breaker is None or breaker["failures"] < BREAKER_FAILURE_THRESHOLD:
+        return False
+    now = time.monotonic()
+    if now - breaker["opened_at"] < BREAKER_COOLDOWN:
+        return True
+    # Half-open: this caller is the probe
+    breaker["opened_at"] = now
+    return False
+
+
+def _record_failure(signal_id: str):
+    breaker = _breakers.setdefault(signal_id, {"failures": 0, "opened_at": 0.0})
+    breaker["failures"] += 1
+    if breaker["failures"] >= BREAKER_FAILURE_THRESHOLD:
+        breaker["opened_at"] = time.monotonic()
+
+
+def _record_success(signal_id: str):
+    _breakers.pop(signal_id, None)
+
+
+# Transient failures are retried with exponential backoff (0.5s, 1s, ... up to
+# SIGNAL_RETRY_MAX_WAIT); awaited sleeps, so the event loop is never blocked.
+# Signal posts are not idempotent: transport errors are only retried when the
+# request never reached the receiver, and every attempt carries the sale ID as
+# Idempotency-Key so receivers can drop a duplicate after a gateway error.
+SIGNAL_MAX_ATTEMPTS = 3
+SIGNAL_RETRY_BASE_WAIT = 0.5
+SIGNAL_RETRY_MAX_WAIT = 4.0
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+RETRYABLE_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+async def _post_with_retry(signal: ActiveSignal, body: bytes, idempotency_key: str) -> httpx.Response:
+    """POST to a signal, retrying connection failures and gateway errors."""
+    headers = {**get_signal_headers(signal), "Idempotency-Key": idempotency_key}
+    for attempt in range(1, SIGNAL_MAX_ATTEMPTS + 1):
+        try:
+            async with get_post_semaphore():
+                response = await get_http_client().post(
+                    signal.url,
+                    content=body,
+                    headers=headers
+                )
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == SIGNAL_MAX_ATTEMPTS:
+                return response
+            reason = f"status {response.status_code}"
+        except RETRYABLE_TRANSPORT_ERRORS as e:
+            if attempt == SIGNAL_MAX_ATTEMPTS:
+                raise
+            reason = type(e).__name__
+
+        wait = min(SIGNAL_RETRY_BASE_WAIT * 2 ** (attempt - 1), SIGNAL_RETRY_MAX_WAIT)
+        logger.debug("Signal %s (%s) attempt %d failed (%s), retrying in %ss", signal.name, signal.id, attempt, reason, wait)
+        await asyncio.sleep(wait)
+
+
+async def notify_single_signal(signal: ActiveSignal, body: bytes, sale_id: str):
     """
-    try:
-        headers = {"Content-Type": "application/json"}
-        auth_config = signal.get_auth_config()
-        headers = apply_signal_auth(headers, auth_config)
+    Notify a single signal with sale data, already serialized to JSON bytes.
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                signal.url,
-                json=payload,
-                headers=headers
-            )
+    Fire-and-forget: errors are logged but don't raise exceptions. Signals whose
+    circuit breaker is open are skipped without a request.
+    """
+    if _breaker_open(signal.id):
+        logger.info("Signal %s (%s) skipped, circuit breaker open", signal.name, signal.id)
+        return
 
-            if response.status_code >= 200 and response.status_code < 300:
-                logger.info(f"Signal {signal.name} ({signal.id}) notified successfully: {response.status_code}")
+    try:
+        response = await _post_with_retry(signal, body, sale_id)
+
+        if response.status_code >= 200 and response.status_code < 300:
+            logger.info("Signal %s (%s) notified successfully: %s", signal.name, signal.id, response.status_code)
+            _record_success(signal.id)
+        else:
+            logger.warning("Signal %s (%s) returned status %s: %s", signal.name, signal.id, response.status_code, response.text[:200])
+            if response.status_code >= 500:
+                _record_failure(signal.id)
             else:
-                logger.warning(f"Signal {signal.name} ({signal.id}) returned status {response.status_code}: {response.text[:200]}")
+                # The endpoint answered; a 4xx is a configuration problem, not an outage
+                _record_success(signal.id)
 
     except httpx.TimeoutException:
-        logger.error(f"Signal {signal.name} ({signal.id}) timed out")
+        logger.error("Signal %s (%s) timed out", signal.name, signal.id)
+        _record_failure(signal.id)
     except httpx.RequestError as e:
-        logger.error(f"Signal {signal.name} ({signal.id}) request error: {str(e)}")
+        logger.error("Signal %s (%s) request error: %s", signal.name, signal.id, e)
+        _record_failure(signal.id)
     except Exception as e:
-        logger.error(f"Signal {signal.name} ({signal.id}) unexpected error: {str(e)}")
+        logger.error("Signal %s (%s) unexpected error: %s", signal.name, signal.id, e)
+        _record_failure(signal.id)
 
 
-async def notify_sale_to_signals(sale: Sale, customer: Customer, staff: Staff, db_session: Session):
+def load_active_signals(db_session: Session) -> tuple[ActiveSignal, ...]:
+    """Get all active signals; they change rarely, so reuse the cached snapshots."""
+    signals = active_signals_cache.get("active")
+    if signals is None:
+        rows = db_session.exec(select(*ACTIVE_SIGNAL_COLUMNS).where(SaleSignal.is_active == True)).all()
+        signals = tuple(ActiveSignal.model_validate(dict(row._mapping)) for row in rows)
+        active_signals_cache.set("active", signals)
+    return signals
+
+
+def _prefetch_active_signals():
+    try:
+        with Session(engine) as db_session:
+            load_active_signals(db_session)
+    except SQLAlchemyError as e:
+        # Only a warm-up: the first sale loads them instead
+        logger.warning("Could not prefetch active signals: %s", e)
+
+
+async def warm_signal_notifier():
+    """Create the HTTP client and load the active signals before the first sale."""
+    get_http_client()
+    await asyncio.to_thread(_prefetch_active_signals)
+
+
+def load_sale_notification(sale_id: str):
     """
-    Notify all active signals about a new sale.
+    Load the active signals and the payload for a sale in a short-lived session.
 
-    This function is called via BackgroundTasks after sale creation.
-    Each signal is notified independently - failures don't affect others.
+    Returns (signals, payload), or None when there is nothing to send.
+    """
+    with Session(engine) as db_session:
+        statement = (
+            select(Sale)
+            .options(joinedload(Sale.customer), joinedload(Sale.staff))
+            .where(Sale.id == sale_id)
+        )
+        sale = db_session.exec(statement).first()
+        if not sale:
+            logger.warning("Sale %s not found, skipping signal notifications", sale_id)
+            return None
+
+        signals = load_active_signals(db_session)
+        if not signals:
+            logger.info("No active signals to notify")
+            return None
+
+        # Generate payload once
+        return signals, generate_sale_signal_payload(sale, sale.customer, sale.staff)
+
+
+async def notify_sale_to_signals(sale_id: str):
     """
-    # Get all active signals
-    statement = select(SaleSignal).where(SaleSignal.is_active == True)
-    signals = db_session.exec(statement).all()
+    Notify all active signals about a new sale.
 
-    if not signals:
-        logger.info("No active signals to notify")
+    Takes only the sale ID and loads what it needs in its own session, so it
+    never touches a request-scoped session or detached ORM instances. The
+    blocking load runs in a worker thread and its session is closed before any
+    signal is called.
+    Signals are notified concurrently and independently - failures don't affect others.
+    """
+    loaded = await asyncio.to_thread(load_sale_notification, sale_id)
+    if loaded is None:
         return
+    signals, payload = loaded
+    # Serialize once for every signal instead of once per request
+    body = orjson.dumps(payload)
+
+    # Notify all signals concurrently: total time is the slowest signal, not the sum.
+    # notify_single_signal logs its own errors; return_exceptions keeps one failure
+    # from cancelling the others.
+    await asyncio.gather(
+        *(notify_single_signal(signal, body, sale_id) for signal in signals),
+        return_exceptions=True
+    )
+
+
+# Strong references to scheduled notification tasks, so they aren't garbage
+# collected before they finish
+_notification_tasks: set = set()
+
+# In the API process, sale notifications that couldn't go through Celery are
+# queued here and drained by a fixed pool of workers, so a burst of sales can't
+# spawn an unbounded number of tasks. Started/stopped by the app lifespan.
+NOTIFICATION_QUEUE_SIZE = 10000
+NOTIFICATION_WORKERS = 8
+NOTIFICATION_ENQUEUE_TIMEOUT = 5.0
+# Seconds shutdown waits for queued notifications before cancelling the workers
+NOTIFICATION_DRAIN_TIMEOUT = 10.0
+_notification_queue: "asyncio.Queue[str] | None" = None
+_notification_workers: list = []
+
+
+async def _notification_worker(queue: "asyncio.Queue[str]"):
+    """Notify signals for queued sale IDs, one at a time, until cancelled."""
+    while True:
+        sale_id = await queue.get()
+        try:
+            await notify_sale_to_signals(sale_id)
+        except Exception as e:
+            logger.error("Signal notifications for sale %s failed: %s", sale_id, e)
+        finally:
+            queue.task_done()
+
+
+def start_notification_workers():
+    """Create the notification queue and its workers on the running event loop."""
+    global _notification_queue
+    _notification_queue = asyncio.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+    _notification_workers[:] = [
+        asyncio.create_task(_notification_worker(_notification_queue))
+        for _ in range(NOTIFICATION_WORKERS)
+    ]
+
+
+async def stop_notification_workers():
+    """Let the workers finish queued notifications for a bounded time, then stop them."""
+    global _notification_queue
+    if _notification_queue is None:
+        return
+    try:
+        await asyncio.wait_for(_notification_queue.join(), NOTIFICATION_DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        # A stuck delivery or a backlog behind an open breaker must not hang shutdown
+        logger.warning(
+            "Signal notification queue not drained after %ss, dropping %d queued sales",
+            NOTIFICATION_DRAIN_TIMEOUT, _notification_queue.qsize()
+        )
+    for worker in _notification_workers:
+        worker.cancel()
+    await asyncio.gather(*_notification_workers, return_exceptions=True)
+    _notification_workers.clear()
+    _notification_queue = None
+
+
+async def _enqueue_with_timeout(queue: "asyncio.Queue[str]", sale_id: str):
+    try:
+        await asyncio.wait_for(queue.put(sale_id), NOTIFICATION_ENQUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error("Signal notification queue full, dropping notifications for sale %s", sale_id)
+
+
+def _spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _notification_tasks.add(task)
+    task.add_done_callback(_notification_tasks.discard)
+
+
+def schedule_sale_notifications(sale_id: str):
+    """
+    Start notify_sale_to_signals in the background without waiting for it.
 
-    # Generate payload once
-    payload = generate_sale_signal_payload(sale, customer, staff)
+    Called from the event loop it queues the sale for the notification workers
+    (or creates a task, when they aren't running). Called from a threadpool
+    handler it hands the sale to the app's event loop, so the handler returns
+    immediately either way.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        try:
+            anyio.from_thread.run_sync(schedule_sale_notifications, sale_id)
+        except RuntimeError:
+            # Not inside the app at all (e.g. a script); just run it here
+            asyncio.run(notify_sale_to_signals(sale_id))
+        return
 
-    # Notify each signal independently
-    for signal in signals:
-        await notify_single_signal(signal, payload)
+    queue = _notification_queue
+    if queue is None:
+        _spawn(notify_sale_to_signals(sale_id))
+        return
+    try:
+        queue.put_nowait(sale_id)
+    except asyncio.QueueFull:
+        # Backpressure: wait briefly for room instead of dropping right away
+        _spawn(_enqueue_with_timeout(queue, sale_id))
+
+
+# Dummy sale sent by test_signal, built once; only created_at changes per call
+_DUMMY_PAYLOAD_TEMPLATE = {
+    "sale_id": "sale_test123456",
+    "customer": {
+        "id": "customer_test123",
+        "phone": "5551234567",
+        "name": "Test Customer",
+        "loyalty_points": "100.00",
+    },
+    "staff": {
+        "id": "staff_test123",
+        "name": "Test Staff",
+    },
+    "items": [
+        {
+            "type": "product",
+            "product_id": "product_test123",
+            "name": "Test Product",
+            "description": "Test product description",
+            "unit_price": "50.00",
+            "quantity": 2,
+            "total": "100.00"
+        }
+    ],
+    "subtotal": "100.00",
+    "discount_amount": "10.00",
+    "total_amount": "90.00",
+    "loyalty_points_generated": 9,
+    "payment_methods": [
+        {
+            "method": "cash",
+            "amount": "90.00",
+            "reference": None
+        }
+    ],
+}
 
 
 async def test_signal(signal: SaleSignal) -> dict:
@@ -137,69 +503,32 @@ async def test_signal(signal: SaleSignal) -> dict:
 
     Returns dict with success status, status_code, response_body, and error.
     """
-    # Generate dummy payload
-    dummy_payload = {
-        "sale_id": "sale_test123456",
-        "customer": {
-            "id": "customer_test123",
-            "phone": "5551234567",
-            "name": "Test Customer",
-            "loyalty_points": "100.00",
-        },
-        "staff": {
-            "id": "staff_test123",
-            "name": "Test Staff",
-        },
-        "items": [
-            {
-                "type": "product",
-                "product_id": "product_test123",
-                "name": "Test Product",
-                "description": "Test product description",
-                "unit_price": "50.00",
-                "quantity": 2,
-                "total": "100.00"
-            }
-        ],
-        "subtotal": "100.00",
-        "discount_amount": "10.00",
-        "total_amount": "90.00",
-        "loyalty_points_generated": 9,
-        "payment_methods": [
-            {
-                "method": "cash",
-                "amount": "90.00",
-                "reference": None
-            }
-        ],
-        "created_at": datetime.utcnow().isoformat(),
-    }
+    dummy_payload = {**_DUMMY_PAYLOAD_TEMPLATE, "created_at": utc_now().isoformat()}
 
     try:
         headers = {"Content-Type": "application/json"}
         auth_config = signal.get_auth_config()
         headers = apply_signal_auth(headers, auth_config)
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                signal.url,
-                json=dummy_payload,
-                headers=headers
-            )
+        response = await get_http_client().post(
+            signal.url,
+            content=orjson.dumps(dummy_payload),
+            headers=headers
+        )
 
-            return {
-                "success": response.status_code >= 200 and response.status_code < 300,
-                "status_code": response.status_code,
-                "response_body": response.text[:500],  # Limit response size
-                "error": None
-            }
+        return {
+            "success": response.status_code >= 200 and response.status_code < 300,
+            "status_code": response.status_code,
+            "response_body": response.text[:500],  # Limit response size
+            "error": None
+        }
 
     except httpx.TimeoutException:
         return {
             "success": False,
             "status_code": None,
             "response_body": None,
-            "error": "Request timed out (10 seconds)"
+            "error": f"Request timed out ({SIGNAL_TIMEOUT:g} seconds)"
         }
     except httpx.RequestError as e:
         return {
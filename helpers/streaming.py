@@ -0,0 +1,41 @@
+"""
+Streaming Helper
+
+Newline-delimited JSON responses for bulk consumers of the list endpoints.
+"""
+
+from typing import Type, Union
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+
+# Rows fetched per round trip when streaming a list
+STREAM_BATCH_SIZE = 100
+
+# OpenAPI description for routes returning ndjson_response
+NDJSON_RESPONSES = {200: {"content": {"application/x-ndjson": {}}, "description": "One JSON object per line"}}
+
+
+def ndjson_response(
+    bind: Union[Engine, Connection],
+    statement,
+    response_model: Type[BaseModel],
+    batch_size: int = STREAM_BATCH_SIZE
+) -> StreamingResponse:
+    """
+    Stream the rows of statement as one response_model JSON object per line.
+
+    The generator runs in the threadpool while the response is sent, after the
+    request's session dependency has been torn down, so it reads through its own
+    session on bind (the engine, normally db_session.get_bind()). yield_per keeps
+    one batch in memory (server-side cursor on PostgreSQL).
+    """
+    def generate():
+        with Session(bind) as stream_session:
+            rows = stream_session.exec(statement.execution_options(yield_per=batch_size))
+            for row in rows:
+                yield response_model.model_validate(row).model_dump_json().encode() + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
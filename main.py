@@ -1,14 +1,34 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine
+from database import engine, warm_connection_pool
+from helpers.signal_notifier import (
+    close_http_client, start_notification_workers, stop_notification_workers, warm_signal_notifier
+)
 from api import pos_customers, pos_products, pos_sales, pos_staff, pos_signals
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the database pool and signal notifier and start the notification workers;
+    drain them, close shared clients and the pool on shutdown."""
+    warm_connection_pool()
+    await warm_signal_notifier()
+    start_notification_workers()
+    yield
+    await stop_notification_workers()
+    await close_http_client()
+    engine.dispose()
+
+
 app = FastAPI(
     title="Agent Hub POS API",
     version="1.0.0",
     docs_url="/pos/api/docs",
-    redoc_url="/pos/api/redoc"
+    redoc_url="/pos/api/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware for development
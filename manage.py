@@ -12,22 +12,94 @@ Usage:
 
 import sys
 import hashlib
-from sqlmodel import SQLModel, text
+import json
+from sqlalchemy import LargeBinary, bindparam, column, inspect, table, update
+from sqlmodel import SQLModel, select, text
 from database import engine, get_session
-from settings import logger
+from settings import logger, ADMIN_PASSWORD_HASH
 from models.auth import User, UserRole, Agent, Token, TokenUser, TokenAgent
-from models.pos_models import Customer, Product, Sale, Staff, SaleWebhook
+from models.pos_models import Customer, Product, Sale, Staff, SaleSignal
+from models.helper import pack_vector
+
+
+def create_extensions():
+    """Enable PostgreSQL extensions required by POS indexes (no-op on SQLite)."""
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    logger.info("✓ Enabled extension: pg_trgm")
+
+
+def migrate_sale_json_columns(session):
+    """Convert legacy TEXT sale.items / sale.payment_methods columns to JSONB (PostgreSQL)."""
+    result = session.exec(text(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = 'sale' AND column_name IN ('items', 'payment_methods')"
+    ))
+    for column_name, data_type in result.fetchall():
+        if data_type != "jsonb":
+            session.exec(text(
+                f"ALTER TABLE sale ALTER COLUMN {column_name} TYPE jsonb USING {column_name}::jsonb"
+            ))
+            logger.info(f"✓ Converted sale.{column_name} to jsonb")
+    session.commit()
+
+
+def migrate_embedding_columns(session, table_names):
+    """Convert legacy JSON text embedding_vector columns to float32 bytes.
+
+    Every JSON list is re-packed with pack_vector. PostgreSQL also changes the
+    column type to bytea; SQLite keeps the declared type and stores the bytes
+    as blobs. Values that are already bytes are left alone, so it can re-run.
+    """
+    connection = session.connection()
+    quote = connection.dialect.identifier_preparer.quote
+    for table_name in table_names:
+        column_types = {info["name"]: info["type"] for info in inspect(connection).get_columns(table_name)}
+        embedding_type = column_types.get("embedding_vector")
+        if embedding_type is None or isinstance(embedding_type, LargeBinary):
+            continue
+
+        # Table and column names are quoted by SQLAlchemy, never pasted into SQL
+        legacy_table = table(table_name, column("id"), column("embedding_vector"))
+        rows = session.exec(
+            select(legacy_table.c.id, legacy_table.c.embedding_vector)
+            .where(legacy_table.c.embedding_vector.is_not(None))
+        ).all()
+        packed = [
+            {"row_id": row_id, "packed": pack_vector(json.loads(value) if isinstance(value, str) else value)}
+            for row_id, value in rows
+            if not isinstance(value, (bytes, memoryview))
+        ]
+
+        if connection.dialect.name == "postgresql":
+            connection.execute(text(
+                f"ALTER TABLE {quote(table_name)} ALTER COLUMN embedding_vector TYPE bytea USING NULL"
+            ))
+        if packed:
+            connection.execute(
+                update(legacy_table)
+                .where(legacy_table.c.id == bindparam("row_id"))
+                .values(embedding_vector=bindparam("packed", type_=LargeBinary())),
+                packed
+            )
+        logger.info(f"✓ Converted {table_name}.embedding_vector to float32 bytes ({len(packed)} values)")
+    session.commit()
 
 
 def init_db():
     """Initialize POS-specific database tables only (auth tables already exist)."""
+    create_extensions()
     logger.info("Creating POS-specific database tables...")
 
     # Get only POS-specific models (exclude auth models that already exist)
-    pos_models = [Customer, Product, Staff, Sale, SaleWebhook]
+    pos_models = [Customer, Product, Staff, Sale, SaleSignal]
 
+    # One connection and transaction for every table instead of one per table
+    SQLModel.metadata.create_all(engine, tables=[model.__table__ for model in pos_models], checkfirst=True)
     for model in pos_models:
-        model.__table__.create(engine, checkfirst=True)
         logger.info(f"✓ Created/verified table: {model.__tablename__}")
 
     logger.info("POS database tables created successfully")
@@ -55,8 +127,10 @@ def reset_db():
 
 
 def update_db():
-    """Intelligently update database - only create missing POS tables."""
+    """Intelligently update database - only create missing POS tables and indexes."""
     try:
+        create_extensions()
+
         with next(get_session()) as session:
             # Get existing tables (using PostgreSQL system tables instead of sqlite_master)
             result = session.exec(text("SELECT tablename FROM pg_tables WHERE schemaname = 'public'"))
@@ -64,7 +138,7 @@ def update_db():
             logger.info(f"Existing tables: {sorted(existing_tables)}")
 
             # Get only POS-specific model tables (exclude auth tables)
-            pos_models = [Customer, Product, Staff, Sale, SaleWebhook]
+            pos_models = [Customer, Product, Staff, Sale, SaleSignal]
             pos_table_names = {model.__tablename__ for model in pos_models}
             logger.info(f"Required POS tables: {sorted(pos_table_names)}")
 
@@ -74,16 +148,30 @@ def update_db():
             if missing_pos_tables:
                 logger.info(f"Creating {len(missing_pos_tables)} missing POS tables: {sorted(missing_pos_tables)}")
 
-                # Create only missing POS tables
-                for model in pos_models:
-                    if model.__tablename__ in missing_pos_tables:
-                        model.__table__.create(engine, checkfirst=True)
-                        logger.info(f"✓ Created table: {model.__tablename__}")
+                # Create only missing POS tables, in one connection and transaction
+                missing_models = [model for model in pos_models if model.__tablename__ in missing_pos_tables]
+                SQLModel.metadata.create_all(engine, tables=[model.__table__ for model in missing_models], checkfirst=True)
+                for model in missing_models:
+                    logger.info(f"✓ Created table: {model.__tablename__}")
 
                 logger.info("POS database update completed successfully")
             else:
                 logger.info("✓ POS database is up to date - no missing tables")
 
+            if Sale.__tablename__ in existing_tables:
+                migrate_sale_json_columns(session)
+            migrate_embedding_columns(
+                session,
+                [model.__tablename__ for model in (Product, Sale) if model.__tablename__ in existing_tables]
+            )
+
+            # Existing tables don't pick up new indexes on their own
+            for model in pos_models:
+                if model.__tablename__ in existing_tables:
+                    for index in model.__table__.indexes:
+                        index.create(engine, checkfirst=True)
+            logger.info("✓ POS indexes verified")
+
     except Exception as e:
         logger.error(f"Failed to update database: {e}")
         sys.exit(1)
@@ -93,7 +181,13 @@ def create_admin(username: str, password: str):
     """Create an admin user."""
     try:
         with next(get_session()) as session:
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
+            if ADMIN_PASSWORD_HASH == "bcrypt":
+                # Deliberately slow, salted KDF; imported here so the other commands
+                # don't need bcrypt installed
+                import bcrypt
+                hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=12)).decode()
+            else:
+                hashed_password = hashlib.sha256(password.encode()).hexdigest()
 
             admin_user = User(
                 username=username,
@@ -1,6 +1,10 @@
 import random
 import string
-from typing import Callable
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
 
 
 def id_generator(prefix: str, n: int) -> Callable[[], str]:
@@ -24,4 +28,77 @@ def id_generator(prefix: str, n: int) -> Callable[[], str]:
         random_part = ''.join(random.choices(safe_chars, k=n))
         return f"{prefix}_{random_part}"
 
-    return generate_id
\ No newline at end of file
+    return generate_id
+
+
+def sortable_id_generator(prefix: str, n: int) -> Callable[[], str]:
+    """
+    Like id_generator, but IDs sort by creation time (ULID-style).
+
+    Format is {prefix}_{9_timestamp_chars}{n_random_chars}: the millisecond
+    timestamp is encoded with the same safe characters, which are in ASCII
+    order, so string comparison follows creation order. New rows land at the
+    right edge of the primary key index instead of on random leaf pages.
+
+    Within one process IDs are strictly increasing: an ID generated in the
+    same millisecond as the previous one (or after the clock stepped back)
+    reuses its timestamp and increments its random part.
+
+    Args:
+        prefix: ID prefix (e.g. 'sale')
+        n: Number of random characters after the timestamp
+
+    Returns:
+        Function that generates IDs with format {prefix}_{timestamp}{random_chars}
+    """
+    safe_chars = '23456789abcdefghjkmnpqrstuvwxyz'
+    base = len(safe_chars)
+    timestamp_length = 9  # 31**9 milliseconds lasts well past the year 2800
+    lock = threading.Lock()
+    last = {"millis": -1, "random": 0}
+
+    def encode(value: int, length: int) -> str:
+        chars = ''
+        for _ in range(length):
+            value, digit = divmod(value, base)
+            chars = safe_chars[digit] + chars
+        return chars
+
+    def generate_id() -> str:
+        with lock:
+            millis = time.time_ns() // 1_000_000
+            if millis > last["millis"]:
+                random_value = random.randrange(base ** n)
+            else:
+                millis = last["millis"]
+                random_value = last["random"] + 1
+                if random_value == base ** n:  # Random part exhausted, borrow the next millisecond
+                    millis += 1
+                    random_value = random.randrange(base ** n)
+            last["millis"], last["random"] = millis, random_value
+        return f"{prefix}_{encode(millis, timestamp_length)}{encode(random_value, n)}"
+
+    return generate_id
+
+
+def utc_now() -> datetime:
+    """
+    Current UTC time, timezone-aware; used as default/onupdate for model timestamps.
+
+    SQLite drops the offset when it stores the value.
+    """
+    return datetime.now(timezone.utc)
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """Pack an embedding as float32 bytes (4 bytes per value, vs ~20 as JSON text)."""
+    return array('f', vector).tobytes()
+
+
+def unpack_vector(data: Optional[bytes]) -> Optional[List[float]]:
+    """Unpack float32 bytes produced by pack_vector, or None if empty."""
+    if not data:
+        return None
+    vector = array('f')
+    vector.frombytes(data)
+    return vector.tolist()
@@ -1,10 +1,12 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import JSON, Column, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from enum import Enum
 from typing import Optional, List, TYPE_CHECKING
-from datetime import datetime, timezone
+from datetime import datetime
 from decimal import Decimal
-from .helper import id_generator
-import json
+from .helper import id_generator, sortable_id_generator, utc_now, pack_vector, unpack_vector
+import orjson
 
 if TYPE_CHECKING:
     pass
@@ -22,34 +24,55 @@ class PaymentMethod(str, Enum):
 
 class Staff(SQLModel, table=True):
     """Modelo para personal del punto de venta."""
+    __table_args__ = (
+        # list_staff only reads active staff ordered by name; index just those rows
+        Index(
+            "ix_staff_active_name", "name",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active")
+        ),
+    )
+
     id: str = Field(default_factory=id_generator('staff', 10), primary_key=True)
     name: str = Field(index=True)
     schedule: str = Field(default="{}")  # JSON string for schedule/shifts
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now, sa_column_kwargs={"onupdate": utc_now})
 
     # Relationships
     sales: List["Sale"] = Relationship(back_populates="staff")
 
     def get_schedule(self) -> dict:
         """Parse schedule JSON string to Python dict."""
-        return json.loads(self.schedule) if self.schedule else {}
+        return orjson.loads(self.schedule) if self.schedule else {}
 
     def set_schedule(self, schedule: dict):
         """Set schedule from Python dict to JSON string."""
-        self.schedule = json.dumps(schedule)
+        self.schedule = orjson.dumps(schedule).decode()
 
 
 class Customer(SQLModel, table=True):
     """Modelo para clientes del punto de venta. No incluye vectores embedding ya que no requiere análisis semántico."""
+    __table_args__ = (
+        # Trigram index so search_customers' LIKE '%x%' is index-backed (requires pg_trgm)
+        Index(
+            "ix_customer_phone_trgm", "phone",
+            postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        # Btree usable by prefix LIKE 'x%' regardless of the database collation
+        Index(
+            "ix_customer_phone_pattern", "phone",
+            postgresql_ops={"phone": "text_pattern_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
     id: str = Field(default_factory=id_generator('customer', 10), primary_key=True)
     phone: str = Field(unique=True, index=True)
     name: Optional[str] = Field(default=None)
     loyalty_points: Decimal = Field(default=Decimal("0.00"))
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now, sa_column_kwargs={"onupdate": utc_now})
 
     # Relationships
     sales: List["Sale"] = Relationship(back_populates="customer")
@@ -57,6 +80,18 @@ class Customer(SQLModel, table=True):
 
 class Product(SQLModel, table=True):
     """Modelo para productos del catálogo. embedding_vector: Vector semántico generado automáticamente al crear/actualizar usando name + description para búsquedas inteligentes. Se llena mediante proceso automático usando OpenAI embeddings."""
+    __table_args__ = (
+        # Trigram indexes so search_products' ILIKE '%q%' substring matches are index-backed
+        Index(
+            "ix_product_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_product_description_trgm", "description",
+            postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
     id: str = Field(default_factory=id_generator('product', 10), primary_key=True)
     name: str = Field(index=True)
     description: Optional[str] = Field(default=None)
@@ -66,61 +101,71 @@ class Product(SQLModel, table=True):
     category: Optional[str] = Field(default=None)  # Product category
     meta_data: str = Field(default="{}")  # JSON string for flexible data (e.g., duration_minutes)
     is_active: bool = Field(default=True)
-    embedding_vector: Optional[str] = Field(default=None)  # JSON string of vector array
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    embedding_vector: Optional[bytes] = Field(default=None)  # float32 vector, see pack_vector
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now, sa_column_kwargs={"onupdate": utc_now})
+
+    def get_embedding_vector(self) -> Optional[List[float]]:
+        """Unpack embedding_vector bytes to a Python list."""
+        return unpack_vector(self.embedding_vector)
+
+    def set_embedding_vector(self, vector: List[float]):
+        """Set embedding_vector from a Python list as float32 bytes."""
+        self.embedding_vector = pack_vector(vector)
 
     def get_meta_data(self) -> dict:
         """Parse meta_data JSON string to Python dict."""
-        return json.loads(self.meta_data) if self.meta_data else {}
+        return orjson.loads(self.meta_data) if self.meta_data else {}
 
     def set_meta_data(self, meta_data: dict):
         """Set meta_data from Python dict to JSON string."""
-        self.meta_data = json.dumps(meta_data)
+        self.meta_data = orjson.dumps(meta_data).decode()
+
+
+# Full-text document for product search. Queries must use this exact expression
+# so PostgreSQL can match it against the expression index below.
+product_search_vector = func.to_tsvector(
+    text("'simple'"),
+    func.coalesce(Product.name, text("''"))
+    .op("||")(text("' '"))
+    .op("||")(func.coalesce(Product.description, text("''")))
+)
+Index("ix_product_search_tsv", product_search_vector, postgresql_using="gin").ddl_if(dialect="postgresql")
 
 
 class Sale(SQLModel, table=True):
     """Modelo para ventas del POS. embedding_vector: Vector generado automáticamente al crear usando contenido de items para análisis de patrones de compra y recomendaciones. Se llena automáticamente usando OpenAI embeddings."""
-    id: str = Field(default_factory=id_generator('sale', 10), primary_key=True)
+    id: str = Field(default_factory=sortable_id_generator('sale', 10), primary_key=True)
     customer_id: str = Field(foreign_key="customer.id", index=True)
     staff_id: str = Field(foreign_key="staff.id", index=True)
-    items: str = Field()  # JSON string of items array
+    items: List[dict] = Field(sa_column=Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False))
     subtotal: Decimal
     discount_amount: Decimal = Field(default=Decimal("0.00"))
     total_amount: Decimal
     loyalty_points_generated: int = Field(default=0)
-    payment_methods: str = Field()  # JSON string of payment methods array
-    embedding_vector: Optional[str] = Field(default=None)  # JSON string of vector array
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    payment_methods: List[dict] = Field(sa_column=Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False))
+    embedding_vector: Optional[bytes] = Field(default=None)  # float32 vector, see pack_vector
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now, sa_column_kwargs={"onupdate": utc_now})
 
     # Relationships
     customer: Optional[Customer] = Relationship(back_populates="sales")
     staff: Optional[Staff] = Relationship(back_populates="sales")
 
-    def get_items(self) -> List[dict]:
-        """Parse items JSON string to Python list."""
-        return json.loads(self.items) if self.items else []
-
-    def set_items(self, items: List[dict]):
-        """Set items from Python list to JSON string."""
-        self.items = json.dumps(items)
-
-    def get_payment_methods(self) -> List[dict]:
-        """Parse payment_methods JSON string to Python list."""
-        return json.loads(self.payment_methods) if self.payment_methods else []
-
-    def set_payment_methods(self, payment_methods: List[dict]):
-        """Set payment_methods from Python list to JSON string."""
-        self.payment_methods = json.dumps(payment_methods)
-
     def get_embedding_vector(self) -> Optional[List[float]]:
-        """Parse embedding_vector JSON string to Python list."""
-        return json.loads(self.embedding_vector) if self.embedding_vector else None
+        """Unpack embedding_vector bytes to a Python list."""
+        return unpack_vector(self.embedding_vector)
 
     def set_embedding_vector(self, vector: List[float]):
-        """Set embedding_vector from Python list to JSON string."""
-        self.embedding_vector = json.dumps(vector)
+        """Set embedding_vector from a Python list as float32 bytes."""
+        self.embedding_vector = pack_vector(vector)
+
+
+# Serves get_customer_sales (WHERE customer_id = ? ORDER BY created_at DESC) as an
+# ordered range scan, with no sort step.
+Index("ix_sale_customer_created", Sale.customer_id, Sale.created_at.desc())
+# Serves list_sales keyset pagination (ORDER BY created_at DESC, id DESC)
+Index("ix_sale_created_id", Sale.created_at.desc(), Sale.id.desc())
 
 
 class SaleSignal(SQLModel, table=True):
@@ -130,13 +175,13 @@ class SaleSignal(SQLModel, table=True):
     url: str = Field()
     is_active: bool = Field(default=True)
     auth_config: str = Field(default="{}")  # JSON string: {"type": "bearer|apikey|basic", "token": "...", "header": "..."}
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now, sa_column_kwargs={"onupdate": utc_now})
 
     def get_auth_config(self) -> dict:
         """Parse auth_config JSON string to Python dict."""
-        return json.loads(self.auth_config) if self.auth_config else {}
+        return orjson.loads(self.auth_config) if self.auth_config else {}
 
     def set_auth_config(self, auth_config: dict):
         """Set auth_config from Python dict to JSON string."""
-        self.auth_config = json.dumps(auth_config)
\ No newline at end of file
+        self.auth_config = orjson.dumps(auth_config).decode()
\ No newline at end of file
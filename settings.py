@@ -42,10 +42,27 @@ elif DB_BACKEND == "postgres":
 else:
     raise ValueError(f"Unsupported DB_BACKEND: {DB_BACKEND}. Use 'sqlite' or 'postgres'")
 
+# PostgreSQL connection pool; sized for the threadpool running the sync handlers (40 by default)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+# Seconds before a pooled connection is replaced, below typical server/proxy idle timeouts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Password hash format for create_admin; must be one the main system's login accepts
+# for the shared user table. "sha256" (unsalted hex digest) is the existing format,
+# switch to "bcrypt" only once the main system verifies $2b$ hashes.
+ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH", "sha256").lower()
+
 # Redis configuration
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+# Connection pool cap; Redis is called from the threadpool running the sync handlers
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Seconds; auth reads Redis on every request and falls back to the database on errors,
+# so a slow or unreachable Redis must fail fast instead of stalling requests
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.25"))
 
 REDIS_URL = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}" if REDIS_PASSWORD else f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
\ No newline at end of file
@@ -0,0 +1,112 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine, Session, SQLModel
+from models.auth import User, Token, TokenUser, UserRole
+from helpers.cache import customer_search_cache, product_search_cache, active_signals_cache
+from datetime import datetime, timezone
+
+# Fixed expiry so the shared admin token never depends on the wall clock
+TOKEN_EXPIRES_AT = datetime(2099, 1, 1, tzinfo=timezone.utc)
+
+
+def pytest_collection_modifyitems(items):
+    """Run every async test on one session-wide event loop instead of a loop per test."""
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
+
+@pytest.fixture(name="engine", scope="session")
+def engine_fixture():
+    """One in-memory database for the whole run; the schema is created once.
+
+    Under pytest-xdist (pytest -n auto) each worker is its own process, so each
+    gets a private database and admin token.
+    """
+    # Streamed responses read from the threadpool, so share one connection across threads
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_connection(dbapi_connection, connection_record):
+        # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN
+        dbapi_connection.isolation_level = None
+        # Throwaway database: skip durability work on every commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(name="admin_token", scope="session")
+def admin_token_fixture(engine):
+    """Create admin user and token for testing, once per run.
+
+    Committed before any test's transaction starts, so rollbacks keep the rows.
+    The returned token is detached with its user relationship loaded.
+    """
+    admin_user = User(
+        username="admin",
+        hashed_password="hashed_secret",
+        role=UserRole.ADMIN
+    )
+
+    token = Token(
+        access_token="admin_token",
+        expires_at=TOKEN_EXPIRES_AT,
+        is_revoked=False
+    )
+
+    with Session(engine, expire_on_commit=False) as session:
+        session.add(TokenUser(token=token, user=admin_user))
+        session.commit()
+
+    return token
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    """Session inside a transaction that is rolled back after the test.
+
+    Handler commits only release a SAVEPOINT, so nothing outlives the test.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    # Like get_session, keep loaded attributes after commit instead of reloading them
+    with Session(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False) as session:
+        yield session
+    transaction.rollback()
+    connection.close()
+    # Caches are per process; don't leak them into other tests
+    customer_search_cache.invalidate()
+    product_search_cache.invalidate()
+    active_signals_cache.invalidate()
+
+
+@pytest.fixture(name="select_statements")
+def select_statements_fixture(engine):
+    """Record the SELECT statements run on the engine during the test."""
+    statements = []
+
+    def _record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _record)
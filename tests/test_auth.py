@@ -0,0 +1,155 @@
+"""
+Feature: Token authentication with a Redis cache
+  As the POS API
+  I want to cache validated tokens in Redis
+  So that most requests skip the token query
+
+Scenario: Cache miss loads the token from the database
+  Given a valid token that is not cached
+  When a request authenticates with it
+  Then the token is loaded from the database
+  And cached under the SHA-256 of the token, never the token itself
+
+Scenario: Cache hit skips the database
+  Given a token that is already cached
+  When a request authenticates with it
+  Then no query is made
+
+Scenario: Cache entries expire with the token, capped
+  Given tokens expiring far in the future and in a few seconds
+  When they are cached
+  Then each entry lives until the token expires, at most the cap
+
+Scenario: Redis errors fall through to the database
+  Given Redis is unreachable
+  When a request authenticates
+  Then the token is loaded from the database
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import redis
+from fastapi import HTTPException
+
+from helpers import auth
+from helpers.auth import get_auth_token, TOKEN_CACHE_MAX_TTL
+from models.auth import Token, TokenUser, User, UserRole
+
+
+class FakeRedis:
+    """In-memory stand-in for the sync redis client; fails every call when down."""
+
+    def __init__(self, down: bool = False):
+        self.down = down
+        self.values = {}
+        self.ttls = {}
+
+    def _check(self):
+        if self.down:
+            raise redis.ConnectionError("Redis is down")
+
+    def get(self, key):
+        self._check()
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self._check()
+        self.values[key] = value
+        self.ttls[key] = ttl
+
+    def delete(self, key):
+        self._check()
+        self.values.pop(key, None)
+        self.ttls.pop(key, None)
+
+
+@pytest.fixture(name="fake_redis")
+def fake_redis_fixture(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(auth, "redis_client", fake)
+    return fake
+
+
+def create_token(session, access_token: str, expires_at: datetime) -> Token:
+    """Commit an admin user with a token expiring at expires_at."""
+    user = User(username=f"user_{access_token}", hashed_password="hashed_secret", role=UserRole.ADMIN)
+    token = Token(access_token=access_token, expires_at=expires_at, is_revoked=False)
+    session.add(TokenUser(token=token, user=user))
+    session.commit()
+    return token
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_loads_and_caches_hashed_key(session, fake_redis):
+    """Test a cache miss reads the database and caches under the token hash."""
+    # Given a valid token that is not cached
+    create_token(session, "miss_token", datetime(2099, 1, 1, tzinfo=timezone.utc))
+
+    # When authenticating with it
+    token = get_auth_token(authorization="Bearer miss_token", db_session=session)
+
+    # Then the token is loaded with its user
+    assert token.access_token == "miss_token"
+    assert token.user.username == "user_miss_token"
+
+    # And cached under its SHA-256, never the token itself
+    expected_key = "tok:" + hashlib.sha256(b"miss_token").hexdigest()
+    assert list(fake_redis.values) == [expected_key]
+    assert all("miss_token" not in key for key in fake_redis.values)
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_database(session, fake_redis, select_statements):
+    """Test a cached token is rebuilt without a query."""
+    # Given a token that is already cached
+    create_token(session, "hit_token", datetime(2099, 1, 1, tzinfo=timezone.utc))
+    get_auth_token(authorization="Bearer hit_token", db_session=session)
+    select_statements.clear()
+
+    # When authenticating with it again
+    token = get_auth_token(authorization="Bearer hit_token", db_session=session)
+
+    # Then it comes from the cache with its user and no query is made
+    assert token.access_token == "hit_token"
+    assert token.user.username == "user_hit_token"
+    assert token.user.hashed_password == ""
+    assert select_statements == []
+
+
+@pytest.mark.asyncio
+async def test_cache_ttl_capped(session, fake_redis):
+    """Test cache entries expire with the token, at most TOKEN_CACHE_MAX_TTL."""
+    # Given tokens expiring far in the future and in a few seconds
+    create_token(session, "long_token", datetime(2099, 1, 1, tzinfo=timezone.utc))
+    create_token(session, "short_token", datetime.now(timezone.utc) + timedelta(seconds=10))
+
+    # When authenticating with them
+    get_auth_token(authorization="Bearer long_token", db_session=session)
+    get_auth_token(authorization="Bearer short_token", db_session=session)
+
+    # Then each entry lives until its token expires, capped
+    long_key = "tok:" + hashlib.sha256(b"long_token").hexdigest()
+    short_key = "tok:" + hashlib.sha256(b"short_token").hexdigest()
+    assert fake_redis.ttls[long_key] == TOKEN_CACHE_MAX_TTL
+    assert 0 < fake_redis.ttls[short_key] <= 10
+
+
+@pytest.mark.asyncio
+async def test_redis_error_falls_back_to_database(session, monkeypatch):
+    """Test authentication still works when Redis is unreachable."""
+    # Given Redis is unreachable
+    monkeypatch.setattr(auth, "redis_client", FakeRedis(down=True))
+    create_token(session, "down_token", datetime(2099, 1, 1, tzinfo=timezone.utc))
+
+    # When authenticating
+    token = get_auth_token(authorization="Bearer down_token", db_session=session)
+
+    # Then the token is loaded from the database
+    assert token.access_token == "down_token"
+
+    # And unknown tokens are still rejected
+    with pytest.raises(HTTPException) as exc_info:
+        get_auth_token(authorization="Bearer unknown_token", db_session=session)
+    assert exc_info.value.status_code == 401
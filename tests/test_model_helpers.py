@@ -0,0 +1,131 @@
+"""
+Feature: Model helpers
+  As the POS data layer
+  I want compact IDs and embeddings
+  So that indexes and rows stay small
+
+Scenario: Sortable IDs follow creation order across milliseconds
+  Given a sortable ID generator
+  When IDs are generated in increasing milliseconds
+  Then they sort in the order they were generated
+
+Scenario: Sortable IDs stay ordered within one millisecond
+  Given a sortable ID generator
+  When many IDs are generated in the same millisecond, or after the clock steps back
+  Then each one sorts after the previous one
+
+Scenario: Embeddings round-trip through float32 bytes
+  Given an embedding vector
+  When it is packed and unpacked
+  Then it takes 4 bytes per value and comes back within float32 precision
+
+Scenario: Legacy JSON embeddings are migrated to float32 bytes
+  Given a table whose embedding_vector column holds JSON text
+  When the embedding migration runs, twice
+  Then every JSON list is replaced by its packed bytes
+  And tables already storing bytes are left alone
+"""
+
+import json
+
+import pytest
+from sqlmodel import text
+
+from manage import migrate_embedding_columns
+from models import helper
+from models.helper import pack_vector, sortable_id_generator, unpack_vector
+from models.pos_models import Product
+
+
+@pytest.fixture(name="clock")
+def clock_fixture(monkeypatch):
+    """Control the millisecond sortable_id_generator reads."""
+    clock = {"millis": 1_760_000_000_000}
+    monkeypatch.setattr(helper.time, "time_ns", lambda: clock["millis"] * 1_000_000)
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_sortable_ids_across_milliseconds(clock):
+    """Test IDs from later milliseconds sort after earlier ones, across digit carries."""
+    # Given a sortable ID generator
+    generate_id = sortable_id_generator('sale', 10)
+    start = clock["millis"]
+
+    # When generating IDs in increasing milliseconds, including base-31 carries
+    ids = []
+    for offset in (0, 1, 30, 31, 32, 961, 29_791):
+        clock["millis"] = start + offset
+        ids.append(generate_id())
+
+    # Then they sort in creation order, with one timestamp per millisecond
+    assert sorted(ids) == ids
+    assert len({sale_id[len('sale_'):len('sale_') + 9] for sale_id in ids}) == len(ids)
+    assert all(len(sale_id) == len('sale_') + 9 + 10 for sale_id in ids)
+
+
+@pytest.mark.asyncio
+async def test_sortable_ids_within_millisecond(clock):
+    """Test IDs from the same millisecond, or after the clock steps back, keep increasing."""
+    # Given a sortable ID generator
+    generate_id = sortable_id_generator('sale', 10)
+
+    # When generating many IDs in the same millisecond
+    ids = [generate_id() for _ in range(500)]
+
+    # Then each sorts after the previous one and they share a timestamp
+    assert sorted(ids) == ids
+    assert len(set(ids)) == len(ids)
+    assert len({sale_id[:len('sale_') + 9] for sale_id in ids}) == 1
+
+    # And the order holds when the clock steps back
+    clock["millis"] -= 5
+    later_id = generate_id()
+    assert later_id > ids[-1]
+
+
+@pytest.mark.asyncio
+async def test_pack_vector_round_trip():
+    """Test embeddings pack to 4 bytes per value and unpack within float32 precision."""
+    # Given an embedding vector
+    vector = [0.1, -0.25, 3.14159, 1e-6, 0.0]
+
+    # When packing and unpacking it
+    packed = pack_vector(vector)
+
+    # Then it takes 4 bytes per value and round-trips within float32 precision
+    assert isinstance(packed, bytes)
+    assert len(packed) == 4 * len(vector)
+    assert unpack_vector(packed) == pytest.approx(vector, rel=1e-6, abs=1e-9)
+
+    # And empty values unpack to None
+    assert unpack_vector(None) is None
+    assert unpack_vector(b"") is None
+
+
+@pytest.mark.asyncio
+async def test_migrate_embedding_columns_json_to_bytes(session):
+    """Test legacy JSON embeddings are re-packed as float32 bytes, idempotently."""
+    # Given a legacy table, with a name that needs quoting, holding JSON embeddings
+    session.exec(text('CREATE TABLE "legacy-product" (id TEXT PRIMARY KEY, embedding_vector TEXT)'))
+    session.exec(text('INSERT INTO "legacy-product" VALUES (:id, :vector)').bindparams(
+        id="prod_a", vector=json.dumps([0.5, -1.5, 2.25])
+    ))
+    session.exec(text('INSERT INTO "legacy-product" VALUES (:id, NULL)').bindparams(id="prod_b"))
+    product = Product(name="Packed", price=1, embedding_vector=pack_vector([1.0]))
+    session.add(product)
+    session.commit()
+
+    # When the migration runs, twice
+    migrate_embedding_columns(session, ["legacy-product", Product.__tablename__])
+    migrate_embedding_columns(session, ["legacy-product", Product.__tablename__])
+
+    # Then JSON lists are replaced by their packed bytes and NULLs stay NULL
+    rows = dict(session.exec(text('SELECT id, embedding_vector FROM "legacy-product"')).all())
+    assert rows["prod_a"] == pack_vector([0.5, -1.5, 2.25])
+    assert unpack_vector(rows["prod_a"]) == [0.5, -1.5, 2.25]
+    assert rows["prod_b"] is None
+
+    # And a table already storing bytes is left alone
+    session.refresh(product)
+    assert product.get_embedding_vector() == [1.0]
@@ -9,6 +9,22 @@ Scenario: Search customer by phone number
   When they search for a customer by phone
   Then the system returns matching customers
 
+Scenario: Search customer by phone prefix
+  Given an admin user is authenticated
+  When they search for a customer by the start of the phone
+  Then the system returns only customers whose phone starts with it
+
+Scenario: Search customer with LIKE wildcards in the query
+  Given an admin user is authenticated
+  When they search with a phone containing % or _
+  Then the wildcards are matched literally
+
+Scenario: Search results refresh after customer changes
+  Given an admin user is authenticated
+  And they already searched for a phone
+  When they create a customer matching that phone
+  Then searching again includes the new customer
+
 Scenario: Create new customer
   Given an admin user is authenticated
   When they create a customer with valid data
@@ -21,6 +37,13 @@ Scenario: Create customer with existing phone
   When they create a customer with that phone
   Then the system returns the existing customer
 
+Scenario: Bulk create customers
+  Given an admin user is authenticated
+  And a customer already exists with one of the phones
+  When they bulk create customers
+  Then the new customers are created
+  And the existing customer is returned unchanged
+
 Scenario: Update customer information
   Given an admin user is authenticated
   And a customer exists
@@ -36,58 +59,24 @@ Scenario: Update customer loyalty points
 Scenario: Get customer sales history
   Given an admin user is authenticated
   And a customer has sales
-  When they request the customer's sales history
+  When they request a page of the customer's sales history
   Then the system returns the sales list
 """
 
 import pytest
-from sqlmodel import create_engine, Session, SQLModel
-from models.auth import User, Token, TokenUser, UserRole
-from models.pos_models import Customer, Sale
+from fastapi import HTTPException
+from models.pos_models import Customer, Sale, Staff
 from database import get_session
 from api.pos_customers import (
-    search_customers, create_customer, update_customer,
+    search_customers, create_customer, bulk_create_customers, update_customer,
     update_customer_wallet, get_customer_sales
 )
-from api.schemas.pos_schemas import CustomerRequest, CustomerWalletRequest
-from datetime import datetime, timedelta, timezone
+from api.schemas.pos_schemas import CustomerRequest, CustomerBulkRequest, CustomerWalletRequest
 from decimal import Decimal
 
 
-@pytest.fixture(name="session")
-def session_fixture():
-    engine = create_engine("sqlite:///:memory:")
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
-    SQLModel.metadata.drop_all(engine)
-
-
-@pytest.fixture(name="admin_token")
-def admin_token_fixture(session):
-    """Create admin user and token for testing."""
-    admin_user = User(
-        username="admin",
-        hashed_password="hashed_secret",
-        role=UserRole.ADMIN
-    )
-
-    token = Token(
-        access_token="admin_token",
-        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
-        is_revoked=False
-    )
-
-    session.add_all([admin_user, token])
-    session.commit()
-    session.refresh(admin_user)
-    session.refresh(token)
-
-    token_user = TokenUser(token_id=token.id, user_id=admin_user.id)
-    session.add(token_user)
-    session.commit()
-
-    return token
+# Request payloads aren't mutated by the handlers; validate them once per module
+JOHN_DOE_REQUEST = CustomerRequest(phone="+1234567890", name="John Doe")
 
 
 @pytest.mark.asyncio
@@ -108,7 +97,7 @@ async def test_search_customers_by_phone(session, admin_token):
     session.commit()
 
     # When searching by partial phone
-    result = await search_customers(
+    result = search_customers(
         phone="1234",
         token=admin_token,
         db_session=session
@@ -120,16 +109,96 @@ async def test_search_customers_by_phone(session, admin_token):
     assert result.customers[0].name == "John Doe"
 
 
+@pytest.mark.asyncio
+async def test_search_customers_by_phone_prefix(session, admin_token):
+    """Test searching customers by phone prefix."""
+    # Given customers exist
+    customer1 = Customer(
+        phone="+1234567890",
+        name="John Doe",
+        loyalty_points=Decimal("50.00")
+    )
+    customer2 = Customer(
+        phone="+5512345678",
+        name="Jane Smith",
+        loyalty_points=Decimal("25.00")
+    )
+    session.add_all([customer1, customer2])
+    session.commit()
+
+    # When searching by phone prefix
+    result = search_customers(
+        phone="+1234",
+        mode="prefix",
+        token=admin_token,
+        db_session=session
+    )
+
+    # Then return only the customer whose phone starts with it
+    assert len(result.customers) == 1
+    assert result.customers[0].phone == "+1234567890"
+
+
+@pytest.mark.asyncio
+async def test_search_customers_escapes_wildcards(session, admin_token):
+    """Test that LIKE wildcards in the search query are matched literally."""
+    # Given customers exist
+    customer = Customer(
+        phone="+1234567890",
+        name="John Doe",
+        loyalty_points=Decimal("50.00")
+    )
+    session.add(customer)
+    session.commit()
+
+    # When searching with wildcard characters
+    result = search_customers(
+        phone="12%90",
+        token=admin_token,
+        db_session=session
+    )
+
+    # Then no customer matches
+    assert len(result.customers) == 0
+
+
+@pytest.mark.asyncio
+async def test_search_customers_cache_invalidated_on_create(session, admin_token):
+    """Test that a cached search is refreshed after creating a customer."""
+    # Given a search was already made
+    first_result = search_customers(
+        phone="1234",
+        mode="contains",
+        token=admin_token,
+        db_session=session
+    )
+    assert len(first_result.customers) == 0
+
+    # When creating a customer matching that search
+    create_customer(
+        customer_data=JOHN_DOE_REQUEST,
+        token=admin_token,
+        db_session=session
+    )
+
+    # Then searching again returns the new customer
+    second_result = search_customers(
+        phone="1234",
+        mode="contains",
+        token=admin_token,
+        db_session=session
+    )
+    assert len(second_result.customers) == 1
+    assert second_result.customers[0].name == "John Doe"
+
+
 @pytest.mark.asyncio
 async def test_create_new_customer(session, admin_token):
     """Test creating a new customer."""
     # When creating a new customer
-    customer_data = CustomerRequest(
-        phone="+1234567890",
-        name="John Doe"
-    )
+    customer_data = JOHN_DOE_REQUEST
 
-    result = await create_customer(
+    result = create_customer(
         customer_data=customer_data,
         token=admin_token,
         db_session=session
@@ -154,15 +223,11 @@ async def test_create_customer_existing_phone(session, admin_token):
     )
     session.add(existing_customer)
     session.commit()
-    session.refresh(existing_customer)
 
     # When creating customer with same phone
-    customer_data = CustomerRequest(
-        phone="+1234567890",
-        name="Different Name"
-    )
+    customer_data = JOHN_DOE_REQUEST.model_copy(update={"name": "Different Name"})
 
-    result = await create_customer(
+    result = create_customer(
         customer_data=customer_data,
         token=admin_token,
         db_session=session
@@ -175,6 +240,40 @@ async def test_create_customer_existing_phone(session, admin_token):
     assert result.loyalty_points == Decimal("100.00")
 
 
+@pytest.mark.asyncio
+async def test_bulk_create_customers(session, admin_token):
+    """Test bulk creating customers keeps existing ones unchanged."""
+    # Given customer already exists
+    existing_customer = Customer(
+        phone="+1234567890",
+        name="John Doe",
+        loyalty_points=Decimal("100.00")
+    )
+    session.add(existing_customer)
+    session.commit()
+
+    # When bulk creating customers including the existing phone
+    bulk_data = CustomerBulkRequest(customers=[
+        CustomerRequest(phone="+1234567890", name="Different Name"),
+        CustomerRequest(phone="+1987654321", name="Jane Smith"),
+    ])
+
+    result = bulk_create_customers(
+        bulk_data=bulk_data,
+        token=admin_token,
+        db_session=session
+    )
+
+    # Then new customer is created and existing one is returned unchanged
+    customers = {customer.phone: customer for customer in result.customers}
+    assert len(customers) == 2
+    assert customers["+1234567890"].id == existing_customer.id
+    assert customers["+1234567890"].name == "John Doe"
+    assert customers["+1234567890"].loyalty_points == Decimal("100.00")
+    assert customers["+1987654321"].name == "Jane Smith"
+    assert customers["+1987654321"].id.startswith("customer_")
+
+
 @pytest.mark.asyncio
 async def test_update_customer_name(session, admin_token):
     """Test updating customer name."""
@@ -186,15 +285,12 @@ async def test_update_customer_name(session, admin_token):
     )
     session.add(customer)
     session.commit()
-    session.refresh(customer)
 
     # When updating customer name
-    customer_data = CustomerRequest(
-        phone="+1234567890",  # Phone cannot be changed
-        name="John Smith"
-    )
+    # Phone cannot be changed
+    customer_data = JOHN_DOE_REQUEST.model_copy(update={"name": "John Smith"})
 
-    result = await update_customer(
+    result = update_customer(
         customer_id=customer.id,
         customer_data=customer_data,
         token=admin_token,
@@ -218,14 +314,13 @@ async def test_update_customer_wallet(session, admin_token):
     )
     session.add(customer)
     session.commit()
-    session.refresh(customer)
 
     # When updating loyalty points
     wallet_data = CustomerWalletRequest(
         loyalty_points=Decimal("150.75")
     )
 
-    result = await update_customer_wallet(
+    result = update_customer_wallet(
         customer_id=customer.id,
         wallet_data=wallet_data,
         token=admin_token,
@@ -246,57 +341,57 @@ async def test_get_customer_sales_history(session, admin_token):
         name="John Doe",
         loyalty_points=Decimal("50.00")
     )
-    session.add(customer)
-    session.commit()
-    session.refresh(customer)
+    staff = Staff(name="Ann")
 
     sale1 = Sale(
         customer_id=customer.id,
-        items='[{"type": "product", "name": "Test Product", "description": "Test", "unit_price": 10.00, "quantity": 2, "total": 20.00}]',
+        staff_id=staff.id,
+        items=[{"type": "product", "name": "Test Product", "description": "Test", "unit_price": 10.00, "quantity": 2, "total": 20.00}],
         subtotal=Decimal("20.00"),
         total_amount=Decimal("20.00"),
-        payment_methods='[{"method": "cash", "amount": 20.00}]'
+        payment_methods=[{"method": "cash", "amount": 20.00}]
     )
     sale2 = Sale(
         customer_id=customer.id,
-        items='[{"type": "product", "name": "Another Product", "description": "Test 2", "unit_price": 15.00, "quantity": 1, "total": 15.00}]',
+        staff_id=staff.id,
+        items=[{"type": "product", "name": "Another Product", "description": "Test 2", "unit_price": 15.00, "quantity": 1, "total": 15.00}],
         subtotal=Decimal("15.00"),
         total_amount=Decimal("15.00"),
-        payment_methods='[{"method": "card", "amount": 15.00}]'
+        payment_methods=[{"method": "card", "amount": 15.00}]
     )
-    session.add_all([sale1, sale2])
+    session.add_all([customer, staff, sale1, sale2])
     session.commit()
 
     # When getting sales history
-    result = await get_customer_sales(
+    result = get_customer_sales(
         customer_id=customer.id,
+        page=1,
+        page_size=20,
         token=admin_token,
         db_session=session
     )
 
-    # Then return sales list
+    # Then return sales list, newest first
     assert len(result) == 2
     assert result[0].customer_id == customer.id
     assert result[0].customer.name == "John Doe"
     assert len(result[0].items) == 1
-    assert result[0].items[0]["name"] == "Test Product"
+    assert result[0].items[0].name == "Another Product"
+    assert result[1].items[0].name == "Test Product"
 
 
 @pytest.mark.asyncio
 async def test_customer_not_found_error(session, admin_token):
     """Test error when customer is not found."""
     # When updating non-existent customer
-    customer_data = CustomerRequest(
-        phone="+1234567890",
-        name="John Doe"
-    )
+    customer_data = JOHN_DOE_REQUEST
 
     # Then raise 404 error
-    with pytest.raises(Exception) as exc_info:
-        await update_customer(
+    with pytest.raises(HTTPException) as exc_info:
+        update_customer(
             customer_id="nonexistent_id",
             customer_data=customer_data,
             token=admin_token,
             db_session=session
         )
-    assert "404" in str(exc_info.value)
\ No newline at end of file
+    assert exc_info.value.status_code == 404
\ No newline at end of file
@@ -10,6 +10,12 @@ Scenario: List all active products
   When they request the product list
   Then the system returns all active products
 
+Scenario: Product list matches the ProductResponse contract
+  Given an admin user is authenticated
+  And a product exists
+  When they request the product list
+  Then each product has exactly the ProductResponse fields, serialized like ProductResponse
+
 Scenario: Search products by name or description
   Given an admin user is authenticated
   And products exist with different names and descriptions
@@ -20,14 +26,18 @@ Scenario: Create new product
   Given an admin user is authenticated
   When they create a product with valid data
   Then the system creates the product successfully
-  And generates embedding vector automatically
+  And no embedding vector is stored while vector search is disabled
+
+Scenario: Bulk create products
+  Given an admin user is authenticated
+  When they create several products at once
+  Then the system creates all products successfully
 
 Scenario: Update existing product
   Given an admin user is authenticated
   And a product exists
   When they update the product
   Then the system updates the product successfully
-  And regenerates embedding vector
 
 Scenario: Soft delete product
   Given an admin user is authenticated
@@ -37,55 +47,30 @@ Scenario: Soft delete product
   And the product is no longer listed in active products
 """
 
+import orjson
 import pytest
-from sqlmodel import create_engine, Session, SQLModel
-from models.auth import User, Token, TokenUser, UserRole
+from fastapi import HTTPException
 from models.pos_models import Product
 from database import get_session
 from api.pos_products import (
-    list_products, search_products, create_product,
+    list_products, search_products, create_product, bulk_create_products,
     update_product, delete_product
 )
-from api.schemas.pos_schemas import ProductRequest
-from datetime import datetime, timedelta, timezone
+from api.schemas.pos_schemas import ProductRequest, ProductBulkRequest, ProductResponse, ProductSearchResponse
 from decimal import Decimal
-from unittest.mock import patch, AsyncMock
-
 
-@pytest.fixture(name="session")
-def session_fixture():
-    engine = create_engine("sqlite:///:memory:")
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
-    SQLModel.metadata.drop_all(engine)
-
-
-@pytest.fixture(name="admin_token")
-def admin_token_fixture(session):
-    """Create admin user and token for testing."""
-    admin_user = User(
-        username="admin",
-        hashed_password="hashed_secret",
-        role=UserRole.ADMIN
-    )
-
-    token = Token(
-        access_token="admin_token",
-        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
-        is_revoked=False
-    )
-
-    session.add_all([admin_user, token])
-    session.commit()
-    session.refresh(admin_user)
-    session.refresh(token)
+# Shared read-only payload, validated once; tests vary it with model_copy
+NEW_PRODUCT_REQUEST = ProductRequest(
+    name="New Product",
+    description="A brand new product",
+    price=Decimal("25.99")
+)
 
-    token_user = TokenUser(token_id=token.id, user_id=admin_user.id)
-    session.add(token_user)
-    session.commit()
 
-    return token
+async def read_product_list(response):
+    """Collect a streamed product list response into its schema."""
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    return ProductSearchResponse.model_validate_json(body)
 
 
 @pytest.mark.asyncio
@@ -114,10 +99,10 @@ async def test_list_active_products(session, admin_token):
     session.commit()
 
     # When listing products
-    result = await list_products(
+    result = await read_product_list(list_products(
         token=admin_token,
         db_session=session
-    )
+    ))
 
     # Then return only active products
     assert len(result.products) == 2
@@ -128,40 +113,39 @@ async def test_list_active_products(session, admin_token):
 
 
 @pytest.mark.asyncio
-async def test_search_products_by_name(session, admin_token):
-    """Test searching products by name."""
-    # Given products with different names
-    product1 = Product(
-        name="Coffee Maker",
-        description="Makes great coffee",
-        price=Decimal("99.99"),
-        is_active=True
-    )
-    product2 = Product(
-        name="Tea Kettle",
-        description="Perfect for tea lovers",
-        price=Decimal("45.00"),
+async def test_list_products_matches_response_model(session, admin_token):
+    """Test the streamed product list carries exactly the ProductResponse shape."""
+    # Given a product exists
+    product = Product(
+        name="Contract Product",
+        description="Checks the wire format",
+        price=Decimal("25.99"),
         is_active=True
     )
-    session.add_all([product1, product2])
+    session.add(product)
     session.commit()
 
-    # When searching by name
-    result = await search_products(
-        q="coffee",
-        token=admin_token,
-        db_session=session
-    )
+    # When listing products
+    response = list_products(token=admin_token, db_session=session)
+    body = b"".join([chunk async for chunk in response.body_iterator])
 
-    # Then return matching product
-    assert len(result.products) == 1
-    assert result.products[0].name == "Coffee Maker"
+    # Then each product is exactly what ProductResponse would send for the stored row
+    session.refresh(product)
+    products = orjson.loads(body)["products"]
+    assert len(products) == 1
+    assert set(products[0]) == set(ProductResponse.model_fields)
+    expected = ProductResponse.model_validate(product.model_dump()).model_dump(mode="json")
+    assert products[0] == expected
 
 
 @pytest.mark.asyncio
-async def test_search_products_by_description(session, admin_token):
-    """Test searching products by description."""
-    # Given products with different descriptions
+@pytest.mark.parametrize("query, expected_name", [
+    ("coffee", "Coffee Maker"),  # matches the name
+    ("tea lovers", "Tea Kettle"),  # matches the description
+])
+async def test_search_products(query, expected_name, session, admin_token):
+    """Test searching products by name or description."""
+    # Given products with different names and descriptions
     product1 = Product(
         name="Coffee Maker",
         description="Makes great coffee",
@@ -177,33 +161,25 @@ async def test_search_products_by_description(session, admin_token):
     session.add_all([product1, product2])
     session.commit()
 
-    # When searching by description
-    result = await search_products(
-        q="tea lovers",
+    # When searching
+    result = search_products(
+        q=query,
         token=admin_token,
         db_session=session
     )
 
     # Then return matching product
     assert len(result.products) == 1
-    assert result.products[0].name == "Tea Kettle"
+    assert result.products[0].name == expected_name
 
 
 @pytest.mark.asyncio
-@patch('api.pos_products.generate_embedding')
-async def test_create_product_with_embedding(mock_embedding, session, admin_token):
-    """Test creating a product with automatic embedding generation."""
-    # Given embedding generation returns a vector
-    mock_embedding.return_value = [0.1, 0.2, 0.3]
-
+async def test_create_product(session, admin_token):
+    """Test creating a product without an embedding vector."""
     # When creating a product
-    product_data = ProductRequest(
-        name="New Product",
-        description="A brand new product",
-        price=Decimal("25.99")
-    )
+    product_data = NEW_PRODUCT_REQUEST
 
-    result = await create_product(
+    result = create_product(
         product_data=product_data,
         token=admin_token,
         db_session=session
@@ -216,43 +192,38 @@ async def test_create_product_with_embedding(mock_embedding, session, admin_toke
     assert result.is_active == True
     assert result.id.startswith("product_")
 
-    # And embedding generation was called
-    mock_embedding.assert_called_once_with("New Product A brand new product")
+    # And no embedding vector is stored while vector search is disabled
+    assert session.get(Product, result.id).embedding_vector is None
 
 
 @pytest.mark.asyncio
-@patch('api.pos_products.generate_embedding')
-async def test_create_product_without_embedding(mock_embedding, session, admin_token):
-    """Test creating a product when embedding generation fails."""
-    # Given embedding generation returns None
-    mock_embedding.return_value = None
-
-    # When creating a product
-    product_data = ProductRequest(
-        name="New Product",
-        description="A brand new product",
-        price=Decimal("25.99")
-    )
-
-    result = await create_product(
-        product_data=product_data,
+async def test_bulk_create_products(session, admin_token):
+    """Test creating several products at once."""
+    # When bulk creating products
+    bulk_data = ProductBulkRequest(products=[
+        ProductRequest(name="Coffee Maker", description="Makes great coffee", price=Decimal("99.99")),
+        ProductRequest(name="Tea Kettle", price=Decimal("45.50"), category="kitchen"),
+    ])
+
+    result = bulk_create_products(
+        bulk_data=bulk_data,
         token=admin_token,
         db_session=session
     )
 
-    # Then product is still created successfully
-    assert result.name == "New Product"
-    assert result.is_active == True
+    # Then all products are created
+    products = {product.name: product for product in result.products}
+    assert len(products) == 2
+    assert products["Coffee Maker"].price == Decimal("99.99")
+    assert products["Tea Kettle"].category == "kitchen"
+    assert all(product.id.startswith("product_") for product in result.products)
+    assert all(product.is_active for product in result.products)
 
 
 @pytest.mark.asyncio
-@patch('api.pos_products.generate_embedding')
-async def test_update_product(mock_embedding, session, admin_token):
+async def test_update_product(session, admin_token):
     """Test updating a product."""
-    # Given embedding regeneration returns a new vector
-    mock_embedding.return_value = [0.4, 0.5, 0.6]
-
-    # And a product exists
+    # Given a product exists
     product = Product(
         name="Old Product",
         description="Old description",
@@ -261,16 +232,15 @@ async def test_update_product(mock_embedding, session, admin_token):
     )
     session.add(product)
     session.commit()
-    session.refresh(product)
 
     # When updating the product
-    product_data = ProductRequest(
-        name="Updated Product",
-        description="Updated description",
-        price=Decimal("15.50")
-    )
+    product_data = NEW_PRODUCT_REQUEST.model_copy(update={
+        "name": "Updated Product",
+        "description": "Updated description",
+        "price": Decimal("15.50")
+    })
 
-    result = await update_product(
+    result = update_product(
         product_id=product.id,
         product_data=product_data,
         token=admin_token,
@@ -283,9 +253,6 @@ async def test_update_product(mock_embedding, session, admin_token):
     assert result.description == "Updated description"
     assert result.price == Decimal("15.50")
 
-    # And embedding regeneration was called
-    mock_embedding.assert_called_once_with("Updated Product Updated description")
-
 
 @pytest.mark.asyncio
 async def test_soft_delete_product(session, admin_token):
@@ -299,10 +266,9 @@ async def test_soft_delete_product(session, admin_token):
     )
     session.add(product)
     session.commit()
-    session.refresh(product)
 
     # When deleting the product
-    result = await delete_product(
+    result = delete_product(
         product_id=product.id,
         token=admin_token,
         db_session=session
@@ -316,10 +282,10 @@ async def test_soft_delete_product(session, admin_token):
     assert updated_product.is_active == False
 
     # And product doesn't appear in active list
-    active_list = await list_products(
+    active_list = await read_product_list(list_products(
         token=admin_token,
         db_session=session
-    )
+    ))
     assert len(active_list.products) == 0
 
 
@@ -327,27 +293,23 @@ async def test_soft_delete_product(session, admin_token):
 async def test_product_not_found_errors(session, admin_token):
     """Test error handling for non-existent products."""
     # When updating non-existent product
-    product_data = ProductRequest(
-        name="Non-existent",
-        description="Does not exist",
-        price=Decimal("10.00")
-    )
+    product_data = NEW_PRODUCT_REQUEST.model_copy(update={"name": "Non-existent", "description": "Does not exist"})
 
     # Then raise 404 error
-    with pytest.raises(Exception) as exc_info:
-        await update_product(
+    with pytest.raises(HTTPException) as exc_info:
+        update_product(
             product_id="nonexistent_id",
             product_data=product_data,
             token=admin_token,
             db_session=session
         )
-    assert "404" in str(exc_info.value)
+    assert exc_info.value.status_code == 404
 
     # When deleting non-existent product
-    with pytest.raises(Exception) as exc_info:
-        await delete_product(
+    with pytest.raises(HTTPException) as exc_info:
+        delete_product(
             product_id="nonexistent_id",
             token=admin_token,
             db_session=session
         )
-    assert "404" in str(exc_info.value)
\ No newline at end of file
+    assert exc_info.value.status_code == 404
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Feature: Sale signal management for POS system
+  As a POS operator
+  I want to manage the signals notified about sales
+  So that external systems receive new sales
+
+Scenario: Revalidate the signal list with its ETag
+  Given an admin user is authenticated
+  And a signal exists
+  When they list signals again with the returned ETag
+  Then the system answers 304 Not Modified
+
+Scenario: The signal list ETag changes after a write
+  Given an admin user is authenticated
+  And they listed signals and kept the ETag
+  When a signal is created, updated or deleted
+  Then the old ETag no longer matches
+
+Scenario: Signal writes invalidate the notifier caches
+  Given the active signals and a signal's headers are cached
+  When the signal is created, updated or deleted
+  Then the notifier reloads the active signals and rebuilds the headers
+"""
+
+import pytest
+from fastapi import Response
+
+from api.pos_signals import create_signal, delete_signal, list_signals, update_signal
+from api.schemas.pos_schemas import SignalRequest
+from helpers.cache import COLLECTION_CACHE_CONTROL, active_signals_cache
+from helpers.signal_notifier import _headers_cache, get_signal_headers, load_active_signals
+
+
+def list_etag(session, admin_token, if_none_match=None):
+    """List signals and return the response status and ETag."""
+    response = Response()
+    result = list_signals(response=response, if_none_match=if_none_match, token=admin_token, db_session=session)
+    if isinstance(result, Response):
+        return result.status_code, result.headers["ETag"]
+    assert response.headers["Cache-Control"] == COLLECTION_CACHE_CONTROL
+    return 200, response.headers["ETag"]
+
+
+@pytest.mark.asyncio
+async def test_list_signals_not_modified(session, admin_token):
+    """Test listing signals with a matching If-None-Match returns 304."""
+    # Given a signal exists
+    create_signal(
+        signal_data=SignalRequest(name="Hook", url="https://example.com/hook"),
+        token=admin_token,
+        db_session=session
+    )
+    status_code, etag = list_etag(session, admin_token)
+    assert status_code == 200
+
+    # When listing again with the returned ETag
+    status_code, same_etag = list_etag(session, admin_token, if_none_match=etag)
+
+    # Then the system answers 304 with the same ETag
+    assert status_code == 304
+    assert same_etag == etag
+
+
+@pytest.mark.asyncio
+async def test_list_signals_etag_changes_after_write(session, admin_token):
+    """Test creating, updating and deleting a signal changes the list ETag."""
+    # Given the signal list ETag before each write
+    _, etag = list_etag(session, admin_token)
+
+    # When a signal is created
+    signal = create_signal(
+        signal_data=SignalRequest(name="Hook", url="https://example.com/hook"),
+        token=admin_token,
+        db_session=session
+    )
+
+    # Then the old ETag no longer matches
+    status_code, created_etag = list_etag(session, admin_token, if_none_match=etag)
+    assert status_code == 200
+    assert created_etag != etag
+
+    # And the same holds after an update and a delete
+    update_signal(
+        signal_id=signal.id,
+        signal_data=SignalRequest(name="Hook", url="https://example.com/other"),
+        token=admin_token,
+        db_session=session
+    )
+    status_code, updated_etag = list_etag(session, admin_token, if_none_match=created_etag)
+    assert status_code == 200
+
+    delete_signal(signal_id=signal.id, token=admin_token, db_session=session)
+    status_code, _ = list_etag(session, admin_token, if_none_match=updated_etag)
+    assert status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_signal_writes_invalidate_notifier_caches(session, admin_token):
+    """Test signal writes drop the cached active signals and headers."""
+    # Given the active signals are cached
+    assert load_active_signals(session) == ()
+
+    # When a signal is created, the notifier sees it
+    signal = create_signal(
+        signal_data=SignalRequest(
+            name="Hook", url="https://example.com/hook", auth_config='{"type": "bearer", "token": "old"}'
+        ),
+        token=admin_token,
+        db_session=session
+    )
+    (snapshot,) = load_active_signals(session)
+    assert get_signal_headers(snapshot)["Authorization"] == "Bearer old"
+
+    # When it is updated, the notifier sees the new config and rebuilds the headers
+    update_signal(
+        signal_id=signal.id,
+        signal_data=SignalRequest(
+            name="Hook", url="https://example.com/hook", auth_config='{"type": "bearer", "token": "new"}'
+        ),
+        token=admin_token,
+        db_session=session
+    )
+    assert signal.id not in _headers_cache
+    (snapshot,) = load_active_signals(session)
+    assert get_signal_headers(snapshot)["Authorization"] == "Bearer new"
+
+    # When it is deleted, the notifier no longer sees it
+    delete_signal(signal_id=signal.id, token=admin_token, db_session=session)
+    assert signal.id not in _headers_cache
+    assert active_signals_cache.get("active") is None
+    assert load_active_signals(session) == ()
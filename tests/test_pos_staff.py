@@ -0,0 +1,76 @@
+"""
+Feature: Staff management for POS system
+  As a POS operator
+  I want to manage staff members
+  So that sales are attributed to who made them
+
+Scenario: Revalidate the staff list with its ETag
+  Given an admin user is authenticated
+  And a staff member exists
+  When they list staff again with the returned ETag
+  Then the system answers 304 Not Modified
+
+Scenario: The staff list ETag changes after a write
+  Given an admin user is authenticated
+  And they listed staff and kept the ETag
+  When a staff member is created, updated or deactivated
+  Then the old ETag no longer matches
+"""
+
+import pytest
+from fastapi import Response
+
+from api.pos_staff import create_staff, delete_staff, list_staff, update_staff
+from api.schemas.pos_schemas import StaffRequest
+from helpers.cache import COLLECTION_CACHE_CONTROL
+
+
+def list_etag(session, admin_token, if_none_match=None):
+    """List staff and return the response status and ETag."""
+    response = Response()
+    result = list_staff(response=response, if_none_match=if_none_match, token=admin_token, db_session=session)
+    if isinstance(result, Response):
+        return result.status_code, result.headers["ETag"]
+    assert response.headers["Cache-Control"] == COLLECTION_CACHE_CONTROL
+    return 200, response.headers["ETag"]
+
+
+@pytest.mark.asyncio
+async def test_list_staff_not_modified(session, admin_token):
+    """Test listing staff with a matching If-None-Match returns 304."""
+    # Given a staff member exists
+    create_staff(staff_data=StaffRequest(name="Ann"), token=admin_token, db_session=session)
+    status_code, etag = list_etag(session, admin_token)
+    assert status_code == 200
+
+    # When listing again with the returned ETag, or a list containing it
+    status_code, same_etag = list_etag(session, admin_token, if_none_match=etag)
+    listed_status_code, _ = list_etag(session, admin_token, if_none_match=f'W/"other", {etag}')
+
+    # Then the system answers 304 with the same ETag
+    assert status_code == listed_status_code == 304
+    assert same_etag == etag
+
+
+@pytest.mark.asyncio
+async def test_list_staff_etag_changes_after_write(session, admin_token):
+    """Test creating, updating and deactivating staff changes the list ETag."""
+    # Given the staff list ETag before each write
+    _, etag = list_etag(session, admin_token)
+
+    # When a staff member is created
+    staff = create_staff(staff_data=StaffRequest(name="Ann"), token=admin_token, db_session=session)
+
+    # Then the old ETag no longer matches
+    status_code, created_etag = list_etag(session, admin_token, if_none_match=etag)
+    assert status_code == 200
+    assert created_etag != etag
+
+    # And the same holds after an update and a deactivation
+    update_staff(staff_id=staff.id, staff_data=StaffRequest(name="Annie"), token=admin_token, db_session=session)
+    status_code, updated_etag = list_etag(session, admin_token, if_none_match=created_etag)
+    assert status_code == 200
+
+    delete_staff(staff_id=staff.id, token=admin_token, db_session=session)
+    status_code, _ = list_etag(session, admin_token, if_none_match=updated_etag)
+    assert status_code == 200
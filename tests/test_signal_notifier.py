@@ -0,0 +1,319 @@
+"""
+Feature: Sale notifications to signals
+  As the POS API
+  I want to notify every active signal about new sales
+  So that external systems learn about sales without slowing checkout
+
+Scenario: Active signals are cached as immutable snapshots
+  Given active and inactive signals exist
+  When the notifier loads the active signals
+  Then it gets frozen snapshots of the active ones only
+  And they stay readable after the session is gone
+
+Scenario: Connection failures and gateway errors are retried
+  Given a signal endpoint that fails before answering
+  When a sale is posted to it
+  Then the post is retried with exponential backoff
+  And every attempt carries the sale ID as Idempotency-Key
+
+Scenario: Failures after the request was sent are not retried
+  Given a signal endpoint that may already have processed the sale
+  When a sale is posted to it
+  Then only one attempt is made
+
+Scenario: Circuit breaker skips a failing signal and probes it once
+  Given a signal that failed BREAKER_FAILURE_THRESHOLD times in a row
+  When sales are notified during and after the cooldown
+  Then it is skipped during the cooldown
+  And after it a single caller probes it while the others keep skipping
+  And a successful probe closes the breaker
+
+Scenario: Queued notifications are drained by a fixed pool of workers
+  Given the notification workers are running
+  When sales are scheduled for notification
+  Then NOTIFICATION_WORKERS workers notify each of them
+  And stopping the workers waits for the queue to drain
+
+Scenario: A full notification queue drops sales after a short wait
+  Given every worker is busy and the queue is full
+  When another sale is scheduled
+  Then it waits for room and is dropped when none frees up
+
+Scenario: Shutdown doesn't wait forever on a stuck delivery
+  Given a notification that never finishes
+  When the workers are stopped
+  Then they are cancelled after NOTIFICATION_DRAIN_TIMEOUT
+"""
+
+import asyncio
+import logging
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from helpers import signal_notifier
+from helpers.signal_notifier import (
+    ActiveSignal, BREAKER_COOLDOWN, BREAKER_FAILURE_THRESHOLD, NOTIFICATION_WORKERS, SIGNAL_MAX_ATTEMPTS,
+    _breaker_open, _breakers, _post_with_retry, _record_failure, _record_success,
+    get_signal_headers, load_active_signals, schedule_sale_notifications,
+    start_notification_workers, stop_notification_workers
+)
+from models.pos_models import SaleSignal
+
+
+@pytest.mark.asyncio
+async def test_load_active_signals_snapshots(session):
+    """Test active signals are cached as frozen snapshots, not ORM instances."""
+    # Given active and inactive signals exist
+    active = SaleSignal(name="Active", url="https://example.com/hook", auth_config='{"type": "bearer", "token": "abc"}')
+    inactive = SaleSignal(name="Inactive", url="https://example.com/off", is_active=False)
+    session.add_all([active, inactive])
+    session.commit()
+
+    # When loading the active signals
+    signals = load_active_signals(session)
+    session.close()
+
+    # Then only the active one is returned, as a frozen snapshot
+    assert len(signals) == 1
+    signal = signals[0]
+    assert isinstance(signal, ActiveSignal)
+    assert (signal.id, signal.name, signal.url) == (active.id, "Active", "https://example.com/hook")
+    with pytest.raises(ValidationError):
+        signal.url = "https://example.com/other"
+
+    # And it stays usable after the session is closed
+    assert get_signal_headers(signal)["Authorization"] == "Bearer abc"
+    assert load_active_signals(session) is signals
+
+
+class FakeHTTPClient:
+    """Stand-in for the signal HTTP client: replays scripted responses or errors."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    async def post(self, url, content=None, headers=None):
+        self.calls.append(headers)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, request=httpx.Request("POST", url))
+
+
+@pytest.fixture(name="fake_http")
+def fake_http_fixture(monkeypatch):
+    """Install a FakeHTTPClient and record retry sleeps instead of sleeping."""
+    def install(*outcomes):
+        client = FakeHTTPClient(outcomes)
+        monkeypatch.setattr(signal_notifier, "get_http_client", lambda: client)
+        return client
+
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(signal_notifier.asyncio, "sleep", fake_sleep)
+    install.sleeps = sleeps
+    return install
+
+
+SIGNAL = ActiveSignal(id="signal_retry", name="Retry", url="https://example.com/hook", auth_config="{}")
+
+
+@pytest.mark.asyncio
+async def test_post_retries_connection_errors_with_backoff(fake_http):
+    """Test connection failures and gateway errors are retried with backoff."""
+    # Given the endpoint refuses the first connection, then answers 503, then 200
+    client = fake_http(httpx.ConnectError("refused"), 503, 200)
+
+    # When posting a sale
+    response = await _post_with_retry(SIGNAL, b"{}", "sale_1")
+
+    # Then it took three attempts with doubling waits
+    assert response.status_code == 200
+    assert len(client.calls) == SIGNAL_MAX_ATTEMPTS
+    assert fake_http.sleeps == [0.5, 1.0]
+
+    # And every attempt carried the same idempotency key
+    assert [headers["Idempotency-Key"] for headers in client.calls] == ["sale_1"] * 3
+
+
+@pytest.mark.asyncio
+async def test_post_gives_up_after_max_attempts(fake_http):
+    """Test the last gateway error is returned once attempts run out."""
+    # Given the endpoint keeps answering 502
+    client = fake_http(502, 502, 502)
+
+    # When posting a sale
+    response = await _post_with_retry(SIGNAL, b"{}", "sale_1")
+
+    # Then the last response is returned after SIGNAL_MAX_ATTEMPTS
+    assert response.status_code == 502
+    assert len(client.calls) == SIGNAL_MAX_ATTEMPTS
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("outcome", [
+    500,  # may have processed the sale
+    400,  # configuration problem
+    httpx.ReadTimeout("slow"),  # request was sent
+    httpx.RemoteProtocolError("dropped"),  # request was sent
+])
+async def test_post_does_not_retry_after_request_was_sent(fake_http, outcome):
+    """Test non-retryable statuses and post-send errors make a single attempt."""
+    # Given the endpoint fails in a way that may follow delivery
+    client = fake_http(outcome)
+
+    # When posting a sale
+    if isinstance(outcome, Exception):
+        with pytest.raises(type(outcome)):
+            await _post_with_retry(SIGNAL, b"{}", "sale_1")
+    else:
+        response = await _post_with_retry(SIGNAL, b"{}", "sale_1")
+        assert response.status_code == outcome
+
+    # Then it is not retried
+    assert len(client.calls) == 1
+    assert fake_http.sleeps == []
+
+
+def expire_cooldown(signal_id: str):
+    """Move the breaker's opening back by one cooldown, as if it had elapsed."""
+    _breakers[signal_id]["opened_at"] -= BREAKER_COOLDOWN
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_then_probes_once():
+    """Test the breaker opens after repeated failures and lets one probe through."""
+    # Given a signal that failed BREAKER_FAILURE_THRESHOLD times in a row
+    signal_id = "signal_breaker_probe"
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        _record_failure(signal_id)
+    assert not _breaker_open(signal_id)
+    _record_failure(signal_id)
+
+    # Then it is skipped during the cooldown
+    assert _breaker_open(signal_id)
+
+    # When the cooldown is over, the first caller probes and the others keep skipping
+    expire_cooldown(signal_id)
+    assert not _breaker_open(signal_id)
+    assert _breaker_open(signal_id)
+    assert _breaker_open(signal_id)
+
+    # And a failed probe opens it for another cooldown
+    _record_failure(signal_id)
+    assert _breaker_open(signal_id)
+
+    # And a successful probe closes it
+    expire_cooldown(signal_id)
+    assert not _breaker_open(signal_id)
+    _record_success(signal_id)
+    assert not _breaker_open(signal_id)
+    assert signal_id not in _breakers
+
+
+@pytest.mark.asyncio
+async def test_breaker_lost_probe_is_replaced_after_cooldown():
+    """Test a probe that never reports doesn't keep the signal skipped forever."""
+    # Given an open breaker whose probe was handed out but never reported back
+    signal_id = "signal_breaker_lost"
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        _record_failure(signal_id)
+    expire_cooldown(signal_id)
+    assert not _breaker_open(signal_id)
+    assert _breaker_open(signal_id)
+
+    # When another cooldown passes
+    expire_cooldown(signal_id)
+
+    # Then one new probe is let through
+    assert not _breaker_open(signal_id)
+    assert _breaker_open(signal_id)
+    _record_success(signal_id)
+
+
+class FakeNotifier:
+    """Stand-in for notify_sale_to_signals; deliveries wait until release is set."""
+
+    def __init__(self):
+        self.sale_ids = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, sale_id):
+        await self.release.wait()
+        self.sale_ids.append(sale_id)
+
+
+@pytest.fixture(name="notifier")
+def notifier_fixture(monkeypatch):
+    notifier = FakeNotifier()
+    monkeypatch.setattr(signal_notifier, "notify_sale_to_signals", notifier)
+    return notifier
+
+
+@pytest.mark.asyncio
+async def test_notification_workers_drain_queue(notifier):
+    """Test queued sales are notified by the worker pool before it stops."""
+    # Given the notification workers are running
+    start_notification_workers()
+    assert len(signal_notifier._notification_workers) == NOTIFICATION_WORKERS
+
+    # When sales are scheduled
+    for index in range(20):
+        schedule_sale_notifications(f"sale_{index}")
+    notifier.release.set()
+
+    # Then stopping waits until every sale was notified
+    await stop_notification_workers()
+    assert sorted(notifier.sale_ids) == sorted(f"sale_{index}" for index in range(20))
+    assert signal_notifier._notification_workers == []
+    assert signal_notifier._notification_queue is None
+
+
+@pytest.mark.asyncio
+async def test_notification_queue_overflow_drops_after_timeout(notifier, monkeypatch, caplog):
+    """Test a sale scheduled on a full queue waits briefly, then is dropped."""
+    # Given every worker is busy and the queue is full
+    monkeypatch.setattr(signal_notifier, "NOTIFICATION_QUEUE_SIZE", 2)
+    monkeypatch.setattr(signal_notifier, "NOTIFICATION_ENQUEUE_TIMEOUT", 0.01)
+    start_notification_workers()
+    for index in range(NOTIFICATION_WORKERS + 2):
+        schedule_sale_notifications(f"sale_{index}")
+        await asyncio.sleep(0)  # Let an idle worker take it
+    assert signal_notifier._notification_queue.full()
+
+    # When another sale is scheduled
+    with caplog.at_level(logging.ERROR, logger="helpers.signal_notifier"):
+        schedule_sale_notifications("sale_overflow")
+        await asyncio.gather(*signal_notifier._notification_tasks)
+
+    # Then it is dropped once no room frees up
+    assert "dropping notifications for sale sale_overflow" in caplog.text
+    notifier.release.set()
+    await stop_notification_workers()
+    assert "sale_overflow" not in notifier.sale_ids
+    assert len(notifier.sale_ids) == NOTIFICATION_WORKERS + 2
+
+
+@pytest.mark.asyncio
+async def test_stop_notification_workers_bounded(notifier, monkeypatch, caplog):
+    """Test shutdown cancels the workers when a delivery never finishes."""
+    # Given a notification that never finishes
+    monkeypatch.setattr(signal_notifier, "NOTIFICATION_DRAIN_TIMEOUT", 0.01)
+    start_notification_workers()
+    schedule_sale_notifications("sale_stuck")
+
+    # When the workers are stopped
+    with caplog.at_level(logging.WARNING, logger="helpers.signal_notifier"):
+        await asyncio.wait_for(stop_notification_workers(), 1.0)
+
+    # Then they were cancelled without notifying it
+    assert "not drained" in caplog.text
+    assert notifier.sale_ids == []
+    assert signal_notifier._notification_workers == []
+    assert signal_notifier._notification_queue is None
@@ -1,10 +1,14 @@
+import asyncio
 from celery import Celery
+from celery.signals import worker_process_shutdown
+from helpers.signal_notifier import notify_sale_to_signals, close_http_client
+from settings import REDIS_URL
 
 # Celery configuration
 celery_app = Celery(
     'agent_hub_pos',
-    broker='redis://localhost:6379/0',
-    backend='redis://localhost:6379/0'
+    broker=REDIS_URL,
+    backend=REDIS_URL
 )
 
 # Celery configuration
@@ -17,7 +21,45 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # Publishers (the API) fail on the first refused broker connection instead of
+    # sleeping through reconnect attempts; the worker's consumer keeps its own
+    # broker_connection_retry loop
+    broker_transport_options={'max_retries': 0},
 )
 
+
+
+# Event loop kept for the life of each (prefork, single-threaded) worker process,
+# so the signal HTTP client and its keep-alive connections survive between tasks
+_worker_loop = None
+
+
+def run_in_worker_loop(coro):
+    """Run a coroutine to completion on this worker process's persistent event loop."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop.run_until_complete(coro)
+
+
+@worker_process_shutdown.connect
+def close_worker_loop(**kwargs):
+    """Close the signal HTTP client and the event loop when the worker process exits."""
+    if _worker_loop is not None and not _worker_loop.is_closed():
+        _worker_loop.run_until_complete(close_http_client())
+        _worker_loop.close()
+
+
+@celery_app.task(ignore_result=True)
+def notify_sale_task(sale_id: str):
+    """
+    Notify active signals about a sale, outside the HTTP workers.
+
+    Receives the sale ID only; notify_sale_to_signals re-fetches the rows in its
+    own session, so this can run in another process after the request ends.
+    """
+    run_in_worker_loop(notify_sale_to_signals(sale_id))
+
+
 if __name__ == '__main__':
     celery_app.start()
\ No newline at end of file